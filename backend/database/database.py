@@ -4,20 +4,66 @@ from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.engine import Engine
 from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 BASE_DIR = Path(__file__).resolve().parent.parent
-DB_PATH = BASE_DIR / "tasks.db"
+DB_PATH = Path(os.getenv("DATABASE_PATH", BASE_DIR / "tasks.db"))
 DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
 
+# dev — как раньше: один движок, echo; prod — WAL, прагмы и отдельные движки чтения/записи
+DB_PROFILE = os.getenv("DB_PROFILE", "dev")
+IS_PROD = DB_PROFILE == "prod"
+DB_ECHO = os.getenv("DB_ECHO", "0" if IS_PROD else "1") == "1"
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 8))
+# Один писатель на процесс: SQLite всё равно сериализует запись, а так запросы
+# ждут в пуле, а не ловят SQLITE_BUSY
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", 1))
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),  # в КиБ, если < 0
+    "temp_store": "MEMORY",
+}
+
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    if IS_PROD:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def _set_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
     cursor.close()
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+if IS_PROD:
+    engine = create_async_engine(
+        DATABASE_URL, echo=DB_ECHO, poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_WRITE_POOL_SIZE, max_overflow=0,
+    )
+    # В WAL читатели не ждут писателя, поэтому списки идут через отдельный пул
+    read_engine = create_async_engine(
+        DATABASE_URL, echo=DB_ECHO, poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_READ_POOL_SIZE, max_overflow=DB_READ_POOL_SIZE,
+    )
+    event.listen(read_engine.sync_engine, "connect", _set_query_only)
+else:
+    engine = create_async_engine(DATABASE_URL, echo=DB_ECHO)
+    read_engine = engine
+
 AsyncSessionLocal = async_sessionmaker(autoflush=False, bind=engine, expire_on_commit=False)
-session = AsyncSessionLocal()
+ReadSessionLocal = async_sessionmaker(autoflush=False, bind=read_engine, expire_on_commit=False)
+
+async def dispose_engines():
+    # Пул держит потоки aiosqlite: без закрытия процесс не завершится
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
 
-class Base(DeclarativeBase):       
-    pass
\ No newline at end of file
+class Base(DeclarativeBase):
+    pass
@@ -0,0 +1,67 @@
+"""Полнотекстовый индекс задач на SQLite FTS5.
+
+task_fts — таблица с внешним содержимым (content='task'): хранит только
+индекс, строки берутся из task. Синхронизацию держат триггеры. user_id
+проиндексирован, чтобы фильтр по пользователю выполнялся внутри FTS-запроса
+(user_id : "42" AND ...), а не после поиска по всем задачам.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import column, table
+
+TASK_FTS_TABLE = "task_fts"
+# Веса bm25 по колонкам title, description, user_id
+TASK_FTS_WEIGHTS = (10.0, 5.0, 0.0)
+MAX_SEARCH_TERMS = 8
+
+TASK_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+        title, description, user_id,
+        content='task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description, user_id)
+        VALUES (new.id, new.title, new.description, new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, user_id)
+        VALUES ('delete', old.id, old.title, old.description, old.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description, user_id ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, user_id)
+        VALUES ('delete', old.id, old.title, old.description, old.user_id);
+        INSERT INTO task_fts(rowid, title, description, user_id)
+        VALUES (new.id, new.title, new.description, new.user_id);
+    END
+    """,
+)
+
+task_fts = table(TASK_FTS_TABLE, column("rowid"))
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def create_task_fts(target, connection, **kw):
+    # Для create_all (dev, проверка планов): в проде таблицу создаёт миграция
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in TASK_FTS_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def fts_match(user_id: int, text: str) -> Optional[str]:
+    """Строит безопасное FTS5-выражение: слова по префиксу, все обязательны."""
+    terms = _TERM_RE.findall(text.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    # В \w+ нет кавычек и операторов FTS5, поэтому слова можно брать в кавычки как есть
+    return f'user_id : "{user_id}" AND ' + " AND ".join(f'"{term}"*' for term in terms)
@@ -0,0 +1,146 @@
+"""Учёт SQL-запросов в рамках HTTP-запроса.
+
+Слушатели before/after_cursor_execute считают число запросов и время в БД
+для текущего запроса (через ContextVar), пишут выборочный лог медленных
+запросов без значений параметров и отмечают N+1 — один и тот же запрос,
+повторённый в рамках запроса больше порога. Итог уходит в заголовки
+ответа X-DB-* и в лог.
+
+Время получения соединения сессией меряется событиями самой сессии:
+do_orm_execute — перед запросом, after_begin — когда соединение получено.
+Сессия остаётся ленивой: соединение берётся из пула только при первом
+запросе, а ответы из кеша и 304 пул не трогают.
+"""
+import logging
+import os
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from backend.database.database import engine, read_engine
+from backend.services.metrics import db_query_duration_seconds, db_session_acquire_seconds
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", 100))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SQL_SLOW_QUERY_SAMPLE_RATE", 1.0))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 5))
+SQL_STATS_HEADERS = os.getenv("SQL_STATS_HEADERS", "1") == "1"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    n_plus_one: set = field(default_factory=set)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _compact(statement: str, limit: int = 500) -> str:
+    return " ".join(statement.split())[:limit]
+
+
+def _param_count(parameters, executemany: bool) -> int:
+    if executemany:
+        return len(parameters)
+    return len(parameters) if parameters else 0
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    db_query_duration_seconds.observe(elapsed)
+
+    if elapsed * 1000 >= SLOW_QUERY_MS and random.random() < SLOW_QUERY_SAMPLE_RATE:
+        # Значения параметров не пишем: в них пароли и пользовательские данные
+        kind = "rows" if executemany else "params"
+        logger.warning(
+            f"Slow query {elapsed * 1000:.1f} ms: {_compact(statement)} "
+            f"[{kind} redacted: {_param_count(parameters, executemany)}]"
+        )
+
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.total_time += elapsed
+    stats.statements[statement] += 1
+    if stats.statements[statement] == N_PLUS_ONE_THRESHOLD + 1:
+        stats.n_plus_one.add(statement)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _before_session_execute(orm_execute_state):
+    # Если транзакции ещё нет, соединение будет взято из пула внутри этого запроса
+    orm_execute_state.session.info["acquire_start"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _after_session_begin(session, transaction, connection):
+    start = session.info.pop("acquire_start", None)
+    if start is None:
+        # Транзакцию открыл flush, а не запрос — момент начала ожидания неизвестен
+        return
+    kind = "read" if read_engine is not engine and connection.engine is read_engine.sync_engine else "write"
+    db_session_acquire_seconds.observe(time.perf_counter() - start, engine=kind)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_session_transaction_end(session, transaction):
+    session.info.pop("acquire_start", None)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and SQL_STATS_HEADERS:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(stats.count)
+                headers["X-DB-Time-Ms"] = f"{stats.total_time * 1000:.2f}"
+                if stats.n_plus_one:
+                    headers["X-DB-N-Plus-One"] = str(len(stats.n_plus_one))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            for statement in stats.n_plus_one:
+                logger.warning(
+                    f"N+1 in {scope['method']} {scope['path']}: "
+                    f"{stats.statements[statement]}x {_compact(statement, 200)}"
+                )
+            logger.debug(
+                f"{scope['method']} {scope['path']}: {stats.count} queries, "
+                f"{stats.total_time * 1000:.2f} ms in DB"
+            )
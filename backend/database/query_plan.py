@@ -0,0 +1,90 @@
+"""Проверка планов горячих запросов.
+
+Прогоняет EXPLAIN QUERY PLAN на пустой схеме SQLite по запросам, собранным
+теми же построителями, что использует сервисный слой, и сообщает о полном
+сканировании таблиц. Запускается тестом tests/test_query_plan.py.
+"""
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+
+from backend.database.database import Base
+from backend.models.models import User
+from backend.services import tasks as task_service
+from backend.services import users as user_service
+from backend.services.outbox import claim_query
+from backend.services.reminders import MARKERS, window_query
+from backend.services.task_stats import task_stats_query
+
+# Запросы, которым полный проход по таблице положен по смыслу
+ALLOWED_FULL_SCANS = {"web.get_users_page"}
+
+
+def route_queries():
+    deadline = datetime(2026, 1, 1)
+    yield "tasks.user_id", task_service.user_id_query(1)
+    yield "tasks.user_version", task_service.user_version_query(1)
+    yield "tasks.tasks_version", task_service.tasks_version_query(1)
+    for order_by in ("id", "deadline"):
+        for is_completed in (None, False, True):
+            for columns in (None, task_service.TASK_READ_COLUMNS):
+                name = f"tasks.tasks_query:{order_by}:{is_completed}:{'rows' if columns else 'orm'}"
+                yield name, task_service.tasks_query(1, is_completed, order_by, limit=100, columns=columns)
+                yield name + ":after", task_service.tasks_query(
+                    1, is_completed, order_by, 10, deadline, 100, columns
+                )
+                if order_by == "deadline":
+                    yield name + ":after_null", task_service.tasks_query(
+                        1, is_completed, order_by, 10, None, 100, columns
+                    )
+    yield "tasks.task", task_service.task_query(1)
+    yield "tasks.task:owner", task_service.task_query(1, user_id=1)
+    for expected_version, user_id in ((None, None), (3, None), (3, 1)):
+        yield f"tasks.patch_task:{expected_version}:{user_id}", task_service.patch_task_query(
+            1, {"title": "t", "deadline": deadline}, expected_version, user_id
+        )
+    yield "tasks.bulk_apply:owned", task_service.owned_task_ids_query(1, [1, 2, 3])
+    yield "tasks.search", task_service.search_query(1, 'user_id : "1" AND "купить"*')
+    yield "users.by_username", user_service.user_by_username_query("u")
+    yield "users.identity", user_service.user_by_username_query("u", user_service.USER_READ_COLUMNS)
+    yield "web.get_users_page", select(User)
+    yield "task_stats.by_telegram_id", task_stats_query(1)
+    yield "outbox.claim", claim_query(deadline)
+    for kind in MARKERS:
+        yield f"reminders.window:{kind}", window_query(kind, deadline)
+
+
+def _plain(value):
+    return value.isoformat(" ") if isinstance(value, datetime) else value
+
+
+def explain(connection, statement):
+    compiled = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = tuple(_plain(compiled.params[key]) for key in compiled.positiontup)
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+
+def is_full_scan(detail: str) -> bool:
+    # "SEARCH ..." — поиск по индексу; "SCAN ..." — проход по всей таблице или индексу
+    if "VIRTUAL TABLE INDEX" in detail and ":M" in detail:
+        # FTS5 с MATCH: поиск по полнотекстовому индексу
+        return False
+    return detail.startswith("SCAN ") and not detail.startswith("SCAN CONSTANT ROW")
+
+
+def check_query_plans(queries=None):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    violations = []
+    with engine.connect() as connection:
+        for name, statement in queries or route_queries():
+            plan = explain(connection, statement)
+            scans = [detail for detail in plan if is_full_scan(detail)]
+            if scans and name not in ALLOWED_FULL_SCANS:
+                violations.append((name, plan))
+    engine.dispose()
+    return violations
+
@@ -0,0 +1,60 @@
+"""Триггеры счётчиков задач пользователя (таблица user_task_stats).
+
+Счётчики меняются в той же транзакции, что и сама задача, при любом пути
+записи: роуты, пакетные операции, планировщик напоминаний, каскадное
+удаление. Просроченной считается незавершённая задача с
+overdue_notified_at: эту отметку ставит планировщик в момент срока.
+/task/stats отдаёт просрочку по deadline, а не из этого счётчика.
+"""
+
+# Вклад строки задачи в счётчики (active, completed, overdue)
+_ACTIVE = "({row}.is_completed = 0)"
+_COMPLETED = "({row}.is_completed = 1)"
+_OVERDUE = "({row}.is_completed = 0 AND {row}.overdue_notified_at IS NOT NULL)"
+
+
+def _add(row: str) -> str:
+    return f"""
+        INSERT INTO user_task_stats(user_id, active, completed, overdue)
+        VALUES ({row}.user_id, {_ACTIVE.format(row=row)}, {_COMPLETED.format(row=row)}, {_OVERDUE.format(row=row)})
+        ON CONFLICT(user_id) DO UPDATE SET
+            active = active + excluded.active,
+            completed = completed + excluded.completed,
+            overdue = overdue + excluded.overdue;"""
+
+
+def _subtract(row: str) -> str:
+    return f"""
+        UPDATE user_task_stats SET
+            active = active - {_ACTIVE.format(row=row)},
+            completed = completed - {_COMPLETED.format(row=row)},
+            overdue = overdue - {_OVERDUE.format(row=row)}
+        WHERE user_id = {row}.user_id;"""
+
+
+TASK_STATS_DDL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON task BEGIN{_add("new")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON task BEGIN{_subtract("old")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_stats_au AFTER UPDATE OF is_completed, overdue_notified_at, user_id ON task
+    WHEN old.is_completed IS NOT new.is_completed
+        OR (old.overdue_notified_at IS NULL) IS NOT (new.overdue_notified_at IS NULL)
+        OR old.user_id IS NOT new.user_id
+    BEGIN{_subtract("old")}{_add("new")}
+    END
+    """,
+)
+
+
+def create_task_stats_triggers(target, connection, **kw):
+    # Для create_all: в проде триггеры создаёт миграция
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in TASK_STATS_DDL:
+        connection.exec_driver_sql(statement)
@@ -1,9 +1,19 @@
-from backend.database.database import AsyncSessionLocal
+from backend.database.database import AsyncSessionLocal, ReadSessionLocal
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# Сессии ленивые: соединение берётся из пула при первом запросе к базе,
+# время ожидания пишет instrumentation в db_session_acquire_seconds
 async def get_db() -> AsyncSession:  
     async with AsyncSessionLocal() as db: 
         try:
             yield db
         finally:
-            await db.close() 
\ No newline at end of file
+            await db.close()
+
+# Сессия на read-only движке: для списков, которые не должны ждать запись
+async def get_read_db() -> AsyncSession:
+    async with ReadSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            await db.close()
@@ -0,0 +1,70 @@
+"""Фоновые задачи бэкенда: outbox, напоминания, сверка счётчиков задач.
+
+Они должны работать в одном процессе: у outbox свой лимит отправки в
+Telegram, и N копий превысили бы его в N раз. При одном воркере задачи
+запускает lifespan приложения. При нескольких backend.server выключает их
+в HTTP-воркерах (APP_BACKGROUND_JOBS=0) и запускает отдельный процесс:
+
+    python -m backend.jobs
+
+Планировщик напоминаний в нём узнаёт о новых сроках из инвалидаций общего
+кеша, поэтому нужен тот же Redis, что и у воркеров.
+"""
+import asyncio
+import logging
+import os
+import signal
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+env_path = Path(__file__).resolve().parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+from backend.database.database import dispose_engines  # noqa: E402
+from backend.services.outbox import outbox_dispatcher  # noqa: E402
+from backend.services.reminders import reminder_scheduler  # noqa: E402
+from backend.services.shared_cache import shared_cache  # noqa: E402
+from backend.services.task_stats import task_stats_checker  # noqa: E402
+from bot.bot import bot  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# 0 — процесс только обслуживает HTTP, фоновые задачи идут в backend.jobs
+BACKGROUND_JOBS = os.getenv("APP_BACKGROUND_JOBS", "1") == "1"
+
+
+async def start_jobs():
+    await outbox_dispatcher.start(bot)
+    await reminder_scheduler.start()
+    await task_stats_checker.start()
+
+
+async def stop_jobs():
+    await task_stats_checker.stop()
+    await reminder_scheduler.stop()
+    await outbox_dispatcher.stop()
+
+
+async def run():
+    shared_cache.add_listener(reminder_scheduler.on_invalidate)
+    await shared_cache.start()
+    await start_jobs()
+    logger.info("Background jobs started")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    await stop_jobs()
+    await shared_cache.stop()
+    await bot.session.close()
+    await dispose_engines()
+    logger.info("Background jobs stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
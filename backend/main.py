@@ -1,21 +1,41 @@
 import os
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from dotenv import load_dotenv
 import uvicorn
 from contextlib import asynccontextmanager
-from backend.routes import auth, user, task, web
+from backend.database.database import dispose_engines
+from backend.database.instrumentation import QueryStatsMiddleware
+from backend.routes import auth, user, task, web, metrics
+from backend.services.assets import ASSETS_BUILD_DIR, PrecompressedStaticFiles, build_assets, load_manifest
+from backend.services.hashing import password_hasher
+from backend.services.metrics import MetricsMiddleware
+from backend.jobs import BACKGROUND_JOBS, start_jobs, stop_jobs
+from backend.services.shared_cache import shared_cache
+from backend.services.warmup import warm_up
 
 env_path = Path(__file__).resolve().parent / '.env'
 load_dotenv(dotenv_path=env_path)
 HOST = os.getenv("APP_HOST", "127.0.0.1")
 PORT = int(os.getenv("APP_PORT", 8000))
+# backend.server собирает статику один раз до запуска воркеров и выключает сборку в них
+ASSETS_BUILD_ON_START = os.getenv("ASSETS_BUILD_ON_START", "1") == "1"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print('Starting server...')
+    await shared_cache.start()
+    # Воркер начнёт принимать соединения только после прогрева
+    await warm_up()
+    # При нескольких воркерах фоновые задачи идут в одном процессе backend.jobs
+    if BACKGROUND_JOBS:
+        await start_jobs()
     yield
+    if BACKGROUND_JOBS:
+        await stop_jobs()
+    await shared_cache.stop()
+    password_hasher.shutdown()
+    await dispose_engines()
     print('Server stopped')
 
 app = FastAPI(
@@ -23,19 +43,29 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Счётчики SQL-запросов и N+1 для каждого запроса
+app.add_middleware(QueryStatsMiddleware)
+# Задержки и статусы по роутерам для /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Подключаем роутеры
 app.include_router(auth.auth_router)
 app.include_router(user.user_router)
 app.include_router(task.task_router)
 app.include_router(web.web_router)
+app.include_router(metrics.metrics_router)
 
-static_path = Path(__file__).parent.absolute() / "static"
-app.mount("/static", StaticFiles(directory=static_path), name="static")
+# Статика с отпечатками и готовыми .gz/.br; сборка идемпотентна и быстрая
+if ASSETS_BUILD_ON_START:
+    build_assets()
+else:
+    load_manifest()
+app.mount("/static", PrecompressedStaticFiles(directory=ASSETS_BUILD_DIR), name="static")
 
 if __name__ == '__main__':
-    
+    # Разработка: один воркер с перезагрузкой; прод — python -m backend.server
     uvicorn.run(
-        'main:app', 
+        'backend.main:app', 
         port=PORT, 
         host=HOST, 
         reload=True
@@ -1,8 +1,10 @@
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy import ForeignKey, BigInteger, String, DateTime
+from sqlalchemy import ForeignKey, BigInteger, String, DateTime, Index, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..database.database import Base
+from ..database.fts import create_task_fts
+from ..database.stats_triggers import create_task_stats_triggers
 
 class User(Base):
     __tablename__ = "user"
@@ -11,6 +13,8 @@ class User(Base):
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True, nullable=True)
     username: Mapped[str] = mapped_column(String(50), unique=True)
     hashed_password: Mapped[str]
+    # Растёт при каждом изменении задач пользователя: из неё строится ETag списков
+    tasks_version: Mapped[int] = mapped_column(default=1, server_default=text('1'))
     
     tasks: Mapped[List["Task"]] = relationship(
         back_populates='user', 
@@ -20,6 +24,26 @@ class User(Base):
 
 class Task(Base):
     __tablename__ = "task"
+    __table_args__ = (
+        # Списки по статусу: (user_id, is_completed) + rowid покрывает ORDER BY id
+        Index('ix_task_user_id_is_completed', 'user_id', 'is_completed'),
+        # Сортировка по сроку в веб-интерфейсе и боте
+        Index('ix_task_user_id_deadline', 'user_id', 'deadline'),
+        # Частичный индекс: только активные задачи по сроку
+        Index(
+            'ix_task_active_user_id_deadline', 'user_id', 'deadline',
+            sqlite_where=text('is_completed = 0')
+        ),
+        # Окна планировщика напоминаний: только ещё не отправленные события
+        Index(
+            'ix_task_reminder_pending', 'deadline',
+            sqlite_where=text('is_completed = 0 AND reminded_at IS NULL')
+        ),
+        Index(
+            'ix_task_overdue_pending', 'deadline',
+            sqlite_where=text('is_completed = 0 AND overdue_notified_at IS NULL')
+        ),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String(100)) # переименовали 'task' в 'title'
@@ -29,6 +53,53 @@ class Task(Base):
     deadline: Mapped[Optional[datetime]] = mapped_column(DateTime) # 'ex_date' -> 'deadline'
     
     is_completed: Mapped[bool] = mapped_column(default=False)
+
+    # Версия для оптимистичной блокировки: каждое изменение увеличивает её на 1
+    version: Mapped[int] = mapped_column(default=1, server_default=text('1'))
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # Отметки отправки напоминания и уведомления о просрочке (сбрасываются при смене срока)
+    reminded_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    overdue_notified_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     
     user_id: Mapped[int] = mapped_column(ForeignKey('user.id', ondelete='CASCADE'), index=True)
     user: Mapped["User"] = relationship(back_populates="tasks")
+
+
+# Полнотекстовый индекс и триггеры вместе с таблицей task при create_all
+event.listen(Task.__table__, "after_create", create_task_fts)
+
+
+class UserTaskStats(Base):
+    """Счётчики задач пользователя; поддерживаются триггерами на task."""
+    __tablename__ = "user_task_stats"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    active: Mapped[int] = mapped_column(default=0, server_default=text('0'))
+    completed: Mapped[int] = mapped_column(default=0, server_default=text('0'))
+    overdue: Mapped[int] = mapped_column(default=0, server_default=text('0'))
+
+
+# Триггеры ссылаются на user_task_stats, поэтому создаются после неё
+event.listen(UserTaskStats.__table__, "after_create", create_task_stats_triggers)
+
+
+class OutboxMessage(Base):
+    """Уведомление в Telegram, записанное в одной транзакции с изменением задачи."""
+    __tablename__ = "outbox_message"
+    __table_args__ = (
+        Index('ix_outbox_message_pending', 'next_attempt_at', sqlite_where=text('failed_at IS NULL')),
+        Index('ix_outbox_message_chat_id', 'chat_id', 'id', sqlite_where=text('failed_at IS NULL')),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    text: Mapped[str]
+    parse_mode: Mapped[Optional[str]] = mapped_column(String(16))
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    attempts: Mapped[int] = mapped_column(default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(String(500))
+    failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
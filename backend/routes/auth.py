@@ -1,14 +1,18 @@
 from typing import Annotated, Optional
 import jwt
+import time
 from datetime import datetime, timezone, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
-from backend.dependencies.dependency import get_db
-from passlib.context import CryptContext
+from backend.database.database import AsyncSessionLocal
+from backend.dependencies.dependency import get_read_db
 from backend.models.models import User
+from backend.services.cache import TTLCache
+from backend.services.hashing import HasherBusy, REHASH_ON_LOGIN, password_hasher, pwd_context
+from backend.services.users import get_user_by_username, get_user_identity_by_username
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 auth_router = APIRouter(prefix='/auth', tags=['auth'])
@@ -17,14 +21,49 @@ SECRET_KEY = os.getenv("SECRET_KEY", "fallback_very_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 60))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+
+# token -> sub из проверенного JWT; пользователь по username — в общем кеше,
+# его инвалидации приходят во все воркеры
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+# bcrypt считается в пуле потоков, а не в event loop
+async def verify_password(plain_password, hashed_password):
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise hasher_busy_exception()
+
+async def verify_and_update_password(user: User, plain_password) -> bool:
+    if not REHASH_ON_LOGIN:
+        return await verify_password(plain_password, user.hashed_password)
+    try:
+        is_valid, new_hash = await password_hasher.verify_and_update(plain_password, user.hashed_password)
+    except HasherBusy:
+        raise hasher_busy_exception()
+    if is_valid and new_hash:
+        # Хеш сохранён с устаревшим cost — заменяем на актуальный. Сессия записи
+        # открывается только здесь, а не на всё время bcrypt
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+            await db.commit()
+    return is_valid
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise hasher_busy_exception()
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -34,37 +73,41 @@ def create_access_token(data: dict):
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    username = token_cache.get(token)
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            expires_at = payload.get("exp")
+            # Токены без срока действия мы не выпускаем
+            if username is None or expires_at is None:
+                raise credentials_exception
+        except jwt.PyJWTError:
             raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
-        
-    result = await db.execute(select(User).where(User.username == username))
-    user = result.scalars().first()
-    
-    if user is None:
+        # Запись не должна пережить срок действия самого токена
+        token_cache.set(token, username, ttl=min(AUTH_CACHE_TTL, expires_at - time.time()))
+
+    identity = await get_user_identity_by_username(db, username)
+    if identity is None:
         raise credentials_exception
-    return user
+    # Объект вне сессии и без хеша пароля: только поля для чтения
+    return User(id=identity.id, username=identity.username, telegram_id=identity.telegram_id)
 
 @auth_router.post('/token')
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(select(User).where(User.username == form_data.username))
-    user = result.scalars().first()
-
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await get_user_by_username(db, form_data.username)
+    is_valid = bool(user) and await verify_and_update_password(user, form_data.password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from backend.routes.auth import token_cache
+from backend.services.metrics import registry
+from backend.services.shared_cache import shared_cache
+
+metrics_router = APIRouter(prefix='/metrics', tags=['Metrics'])
+
+# 1. Метрики в текстовом формате Prometheus
+@metrics_router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# 2. Квантили задержек по гистограммам
+@metrics_router.get("/summary")
+async def get_metrics_summary():
+    return registry.summary()
+
+# 3. Заполнение и попадания кешей токенов и пользователей
+@metrics_router.get("/cache")
+async def get_cache_stats():
+    return {"tokens": token_cache.stats(), "users": shared_cache.stats()}
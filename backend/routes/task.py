@@ -1,130 +1,246 @@
 from datetime import datetime
 import os
-from typing import List
-from fastapi import APIRouter, Depends, Request, HTTPException, status
-from fastapi.responses import RedirectResponse
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, HTTPException, status
+import orjson
+from fastapi.responses import ORJSONResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete, select, update
-from sqlalchemy.orm import joinedload, selectinload
 
 
-from backend.models.models import Task, User
-from backend.dependencies.dependency import get_db
-from backend.schemas.schemas import TaskCreateSchema, TaskUpdateSchema, TaskDeleteSchema
-
-from bot.bot import bot 
+from backend.database.database import ReadSessionLocal
+from backend.dependencies.dependency import get_db, get_read_db
+from backend.schemas.schemas import (
+    TaskCreateSchema, TaskUpdateSchema, TaskDeleteSchema, TaskFilterQuery, TaskPageQuery, TaskReadSchema,
+    TaskBulkSchema, TaskBulkResultSchema, TaskPatchSchema, TaskSearchQuery, TaskStatsSchema
+)
+from backend.services import tasks as task_service
+from backend.services.task_stats import get_task_stats_by_telegram_id
+from backend.services.etag import is_not_modified, not_modified, set_etag, tasks_etag
+from backend.services.shared_cache import shared_cache, tasks_page_key
+from backend.services.tasks import PAGE_SIZE_DEFAULT, TASK_READ_COLUMNS, TaskVersionConflict, tasks_query
+from backend.services.users import get_user_identity_by_username
 
 task_router = APIRouter(
     prefix='/task',
-    tags=['Tasks']
+    tags=['Tasks'],
+    default_response_class=ORJSONResponse
 )
 
+STREAM_YIELD_PER = 500
+
+
+async def _stream_tasks(query):
+    # Отдельная сессия: зависимость get_db закрывается раньше, чем уйдёт тело ответа
+    async with ReadSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_YIELD_PER))
+        async for row in result:
+            yield orjson.dumps(row._asdict()) + b"\n"
+
+
+async def _tasks_page(
+    db: AsyncSession,
+    request: Request,
+    page: TaskPageQuery,
+    user_id: int,
+    is_completed: Optional[bool] = None,
+    version: Optional[int] = None,
+):
+    # Версия задач пользователя совпала — таблицу task не трогаем
+    etag = tasks_etag(request, user_id, version) if version is not None else None
+    if etag and is_not_modified(request, etag):
+        return not_modified(etag)
+
+    if page.stream:
+        query = tasks_query(
+            user_id, is_completed, page.order_by, page.after_id, page.after_deadline, page.limit,
+            TASK_READ_COLUMNS,
+        )
+        streaming = StreamingResponse(_stream_tasks(query), media_type="application/x-ndjson")
+        if etag:
+            set_etag(streaming, etag)
+        return streaming
+
+    limit = page.limit or PAGE_SIZE_DEFAULT
+    # В ключе версия задач: после изменения читается новый ключ, старый истечёт сам
+    key = tasks_page_key(
+        user_id, version, is_completed, page.order_by, page.after_id, page.after_deadline, limit
+    ) if version is not None else None
+    cached = await shared_cache.get(key) if key else None
+    if cached is not None:
+        cursor, body = cached.split(b"\n", 1)
+        cursor = cursor.decode()
+    else:
+        rows = await task_service.list_task_rows(
+            db, user_id, is_completed, page.order_by, page.after_id, page.after_deadline, limit
+        )
+        # Кортежи колонок уже в форме TaskReadSchema: сериализуем orjson без jsonable_encoder
+        body = orjson.dumps([row._asdict() for row in rows])
+        cursor = task_service.next_cursor(rows, limit, page.order_by) or ""
+        if key:
+            await shared_cache.set(key, cursor.encode() + b"\n" + body)
+
+    response = Response(body, media_type="application/json")
+    # Курсор следующей страницы отдаём заголовком, тело остаётся списком задач
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    if etag:
+        set_etag(response, etag)
+    return response
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    # If-Match: "3" (или W/"3"); "*" — без проверки версии
+    if not if_match or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
 # 1. Показать ВСЕ задачи пользователя
-@task_router.get("/show/{user_tg_id}")
-async def get_all_tasks(user_tg_id: int, db: AsyncSession = Depends(get_db)):
-    user_result = await db.execute(select(User).where(User.telegram_id == user_tg_id))
-    user_id = user_result.scalar_one_or_none()
-    result = await db.execute(select(Task).where(Task.user_id == user_id.id))
-    return result.scalars().all()
+@task_router.get("/show/{user_tg_id}", response_model=List[TaskReadSchema])
+async def get_all_tasks(
+    user_tg_id: int,
+    page: Annotated[TaskFilterQuery, Query()],
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    user = await task_service.get_user_version_by_telegram_id(db, user_tg_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return await _tasks_page(
+        db, request, page, user.id, page.is_completed, user.tasks_version
+    )
 
 # 2. Показать только АКТИВНЫЕ задачи
-@task_router.get("/showactive/{user_id}")
-async def get_active_tasks(user_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Task).where(Task.user_id == user_id, Task.is_completed == False)
-    )
-    return result.scalars().all()
+@task_router.get("/showactive/{user_id}", response_model=List[TaskReadSchema])
+async def get_active_tasks(
+    user_id: int,
+    page: Annotated[TaskPageQuery, Query()],
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    version = await task_service.get_tasks_version(db, user_id)
+    return await _tasks_page(db, request, page, user_id, False, version)
 
 # 3. Показать только ЗАВЕРШЕННЫЕ задачи
-@task_router.get("/showclosed/{user_id}")
-async def get_closed_tasks(user_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Task).where(Task.user_id == user_id, Task.is_completed == True)
-    )
-    return result.scalars().all()
+@task_router.get("/showclosed/{user_id}", response_model=List[TaskReadSchema])
+async def get_closed_tasks(
+    user_id: int,
+    page: Annotated[TaskPageQuery, Query()],
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    version = await task_service.get_tasks_version(db, user_id)
+    return await _tasks_page(db, request, page, user_id, True, version)
+
+# Счётчики активных и завершённых задач — одна строка по ключу, просроченные — по сроку на момент запроса
+@task_router.get("/stats/{user_tg_id}", response_model=TaskStatsSchema)
+async def get_task_stats(user_tg_id: int, db: AsyncSession = Depends(get_read_db)):
+    stats = await get_task_stats_by_telegram_id(db, user_tg_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return ORJSONResponse(stats._asdict())
+
+# Поиск по названию и описанию задач пользователя
+@task_router.get("/search/{user_tg_id}", response_model=List[TaskReadSchema])
+async def search_tasks(
+    user_tg_id: int,
+    page: Annotated[TaskSearchQuery, Query()],
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    user = await task_service.get_user_version_by_telegram_id(db, user_tg_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    etag = tasks_etag(request, user.id, user.tasks_version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    rows = await task_service.search_tasks(db, user.id, page.q, page.limit, page.offset)
+    response = ORJSONResponse([row._asdict() for row in rows])
+    if len(rows) == page.limit:
+        response.headers["X-Next-Cursor"] = f"offset={page.offset + page.limit}"
+    set_etag(response, etag)
+    return response
 
 # 4. Добавление новой задачи
 @task_router.post("/add/")
 async def add_task(task_data: TaskCreateSchema, db: AsyncSession = Depends(get_db)):
-    user_query = await db.execute(select(User).where(User.username == task_data.username))
-    user = user_query.scalars().first()
+    user = await get_user_identity_by_username(db, task_data.username)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    new_task = Task(
-        title=task_data.title,
-        description=task_data.description,
-        deadline=task_data.deadline,
-        is_completed=False,
-        user_id=user.id
+    await task_service.create_task(
+        db, user, task_data.title, task_data.description, task_data.deadline
     )
-    
-    db.add(new_task)
-    await db.commit()
-    await db.refresh(new_task)
-    await db.refresh(user)
-
-    if user.telegram_id:
-        try:
-            deadline_str = new_task.deadline.strftime('%d.%m.%Y') if new_task.deadline else "не указан"
-            text = f"✅ **Новая задача создана!**\n\n📌 {new_task.title}\n📝 {new_task.description}\n📅 Срок: {deadline_str}"
-            await bot.send_message(user.telegram_id, text, parse_mode="Markdown")
-        except Exception as e:
-            print(f"Ошибка отправки уведомления: {e}")
-
     return RedirectResponse(url=f"/tasks/{user.username}", status_code=status.HTTP_303_SEE_OTHER)
 
 # 5. Удаление задачи
 @task_router.delete('/delete/')
 async def del_task(task_data: TaskDeleteSchema, db: AsyncSession = Depends(get_db)):
-    query = await db.execute(select(Task).where(Task.id == task_data.id))
-    task_obj = query.scalars().first()
+    task_obj = await task_service.delete_task(db, task_data.id)
     
     if not task_obj:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    user_query = await db.execute(select(User).where(User.id == task_obj.user_id))
-    user = user_query.scalars().first()
-
-    await db.execute(delete(Task).where(Task.id == task_data.id))
-    await db.commit()
-
-    if user and user.telegram_id:
-        await bot.send_message(user.telegram_id, f"🗑 Задача удалена: {task_obj.title}")
-
     return {"status": "deleted"}
 
 # 6. Обновление задачи
 @task_router.put('/update/')
 async def update_task(updating_task: TaskUpdateSchema, db: AsyncSession = Depends(get_db)):
     field = updating_task.field
-    new_value = updating_task.new_value
-
-    if field == "is_completed":
-        new_value = True if str(new_value).lower() in ['true', '1', 'yes'] else False
-    elif field == "deadline":
-        try:
-            # Превращаем строку "2026-01-17" в объект Python datetime
-            new_value = datetime.strptime(new_value, '%Y-%m-%d')
-        except (ValueError, TypeError):
-            # Если пришла пустая строка или плохой формат — записываем None или выдаем ошибку
-            new_value = None
-
-    await db.execute(
-        update(Task).where(Task.id == updating_task.id).values({field: new_value})
-    )
-    await db.commit()
+    new_value = task_service.parse_field_value(field, updating_task.new_value)
+
+    await task_service.update_task_field(db, updating_task.id, field, new_value)
+
+    return {"status": "updated", "field": field, "value": new_value}
 
-    task_query = await db.execute(
-        select(Task)
-        .options(joinedload(Task.user)) # Загружаем пользователя через JOIN
-        .where(Task.id == updating_task.id)
+# 7. Пакетное создание, изменение, завершение и удаление задач
+@task_router.post('/bulk', response_model=TaskBulkResultSchema)
+async def bulk_tasks(bulk: TaskBulkSchema, db: AsyncSession = Depends(get_db)):
+    user = await get_user_identity_by_username(db, bulk.username)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    results = await task_service.bulk_apply(
+        db,
+        user,
+        creates=[item.model_dump() for item in bulk.create],
+        updates=[item.model_dump(exclude_unset=True) | {"id": item.id} for item in bulk.update],
+        complete_ids=bulk.complete,
+        delete_ids=bulk.delete,
     )
-    task_obj = task_query.scalars().first()
 
-    if task_obj and task_obj.user.telegram_id:
-        msg = f"🔄 Задача обновлена!\nПоле *{field}* изменено на: `{new_value}`"
-        await bot.send_message(task_obj.user.telegram_id, msg, parse_mode="Markdown")
+    summary = {"results": results}
+    for item in results:
+        summary[item["status"]] = summary.get(item["status"], 0) + 1
+    return summary
+
+# 8. Частичное обновление задачи с проверкой версии
+@task_router.patch('/{task_id}', response_model=TaskReadSchema)
+async def patch_task(
+    task_id: int,
+    patch: TaskPatchSchema,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    values = patch.model_dump(exclude_unset=True, exclude={"version"})
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    expected_version = patch.version if patch.version is not None else _parse_if_match(if_match)
+
+    try:
+        task_obj = await task_service.patch_task(db, task_id, values, expected_version)
+    except TaskVersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Task was modified, current version is {e.current_version}",
+            headers={"ETag": f'"{e.current_version}"'},
+        )
+    if not task_obj:
+        raise HTTPException(status_code=404, detail="Task not found")
 
-    return {"status": "updated", "field": field, "value": new_value}
+    response.headers["ETag"] = f'"{task_obj.version}"'
+    return task_obj
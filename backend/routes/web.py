@@ -1,15 +1,62 @@
-from fastapi import APIRouter, Depends, Request, status
+import os
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
 from backend.models.models import User
-from backend.dependencies.dependency import get_db
+from backend.dependencies.dependency import get_db, get_read_db
+from backend.schemas.schemas import TaskPatchSchema, TaskRowCreateSchema
+from backend.services import tasks as task_service
+from backend.services import users as user_service
+from backend.services.assets import asset_url
+from backend.services.etag import is_not_modified, not_modified, set_etag, tasks_etag
+from backend.services.tasks import TaskVersionConflict
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+WEB_PAGE_SIZE = int(os.getenv("WEB_PAGE_SIZE", 50))
+# В проде шаблоны не меняются: отключаем проверку mtime на каждый рендер
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "1") == "1"
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR")
+
+if JINJA_CACHE_DIR:
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
 
 web_router = APIRouter(tags=['Web Pages'])
-templates = Jinja2Templates(directory="backend/templates")
+templates = Jinja2Templates(env=Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATES_AUTO_RELOAD,
+    # Скомпилированный байткод переживает перезапуск и новые воркеры
+    bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR) if JINJA_CACHE_DIR else FileSystemBytecodeCache(),
+))
+templates.env.globals["asset_url"] = asset_url
+
+
+def precompile_templates() -> int:
+    # Компилируем все шаблоны при старте, чтобы первый запрос не платил за это
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+
+async def _get_user(db: AsyncSession, username: str) -> User:
+    user = await user_service.get_user_by_username(db, username)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+def _row_response(request: Request, task, status_code: int = 200):
+    return templates.TemplateResponse(
+        request=request, name="_task_row.html", context={"task": task, "number": ""},
+        status_code=status_code,
+    )
 
 @web_router.get('/', response_class=HTMLResponse)
 async def index(request: Request):
@@ -24,10 +71,9 @@ async def register_page(request: Request):
     return templates.TemplateResponse(request=request, name="register.html")
 
 @web_router.get("/users/", response_class=HTMLResponse)
-async def get_users_page(request: Request, db: AsyncSession = Depends(get_db)):
+async def get_users_page(request: Request, db: AsyncSession = Depends(get_read_db)):
     # Асинхронное получение списка
-    result = await db.execute(select(User))
-    users = result.scalars().all()
+    users = await user_service.list_users(db)
     
     # Передаем список объектов напрямую. Jinja2 сама возьмет нужные поля.
     return templates.TemplateResponse(
@@ -36,17 +82,95 @@ async def get_users_page(request: Request, db: AsyncSession = Depends(get_db)):
     )
 
 @web_router.get("/tasks/{username}", response_class=HTMLResponse)
-async def get_tasks_page(request: Request, username: str, db: AsyncSession = Depends(get_db)):
-    # Ищем пользователя со всеми его задачами
-    result = await db.execute(select(User).where(User.username == username).options(selectinload(User.tasks)))
-    print(result)
-    user = result.scalars().first()
+async def get_tasks_page(request: Request, username: str, db: AsyncSession = Depends(get_read_db)):
+    user = await user_service.get_user_by_username(db, username)
     
     if not user:
-        # Можно вернуть 404 страницу
         return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
-        
-    return templates.TemplateResponse(
+
+    # Задачи не менялись с прошлого показа — не читаем их и не рендерим страницу
+    etag = tasks_etag(request, user.id, user.tasks_version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    # Рендерим только первую страницу, остальные догружаются фрагментами
+    tasks = await task_service.list_task_rows(db, user.id, limit=WEB_PAGE_SIZE)
+    response = templates.TemplateResponse(
         "tasks.html", 
-        {"request": request, "user": user}
+        {
+            "request": request,
+            "user": user,
+            "tasks": tasks,
+            "next_cursor": task_service.next_cursor(tasks, WEB_PAGE_SIZE),
+        }
+    )
+    set_etag(response, etag)
+    return response
+
+# Фрагменты страницы задач: строки таблицы вместо всей страницы
+
+@web_router.get("/tasks/{username}/rows", response_class=HTMLResponse)
+async def get_task_rows(
+    request: Request,
+    username: str,
+    after_id: Optional[int] = None,
+    start: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    user = await _get_user(db, username)
+    etag = tasks_etag(request, user.id, user.tasks_version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    tasks = await task_service.list_task_rows(db, user.id, after_id=after_id, limit=WEB_PAGE_SIZE)
+    response = templates.TemplateResponse(
+        request=request, name="_task_rows.html", context={"tasks": tasks, "start": start}
+    )
+    cursor = task_service.next_cursor(tasks, WEB_PAGE_SIZE)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    set_etag(response, etag)
+    return response
+
+@web_router.post("/tasks/{username}/rows", response_class=HTMLResponse)
+async def create_task_row(
+    request: Request,
+    username: str,
+    task_data: TaskRowCreateSchema,
+    db: AsyncSession = Depends(get_db)
+):
+    user = await _get_user(db, username)
+    task_obj = await task_service.create_task(
+        db, user, task_data.title, task_data.description, task_data.deadline
     )
+    return _row_response(request, task_obj, status_code=status.HTTP_201_CREATED)
+
+@web_router.patch("/tasks/{username}/rows/{task_id}", response_class=HTMLResponse)
+async def update_task_row(
+    request: Request,
+    username: str,
+    task_id: int,
+    patch: TaskPatchSchema,
+    db: AsyncSession = Depends(get_db)
+):
+    user = await _get_user(db, username)
+    values = patch.model_dump(exclude_unset=True, exclude={"version"})
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    try:
+        task_obj = await task_service.patch_task(db, task_id, values, patch.version, user_id=user.id)
+    except TaskVersionConflict as e:
+        raise HTTPException(
+            status_code=409, detail=f"Task was modified, current version is {e.current_version}"
+        )
+    if not task_obj:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return _row_response(request, task_obj)
+
+@web_router.delete("/tasks/{username}/rows/{task_id}")
+async def delete_task_row(username: str, task_id: int, db: AsyncSession = Depends(get_db)):
+    user = await _get_user(db, username)
+    if not await task_service.delete_task(db, task_id, user_id=user.id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return Response(status_code=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 
 # --- Схемы для Пользователей ---
@@ -35,13 +35,35 @@ class TaskCreateSchema(BaseModel):
 
 class TaskUpdateSchema(BaseModel):
     id: int
-    field: str 
+    # Только поля, которые меняет пользователь; служебные колонки не принимаются
+    field: Literal["title", "description", "deadline", "is_completed"]
     new_value: str
     username: str
 
 class TaskDeleteSchema(BaseModel):
     id: int
 
+# Создание задачи со страницы пользователя: имя берётся из URL
+class TaskRowCreateSchema(BaseModel):
+    title: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = Field(None, max_length=500)
+    deadline: Optional[datetime] = None
+
+class TaskPatchSchema(BaseModel):
+    # Меняются только переданные поля; version — ожидаемая версия (вместо If-Match)
+    title: Optional[str] = Field(None, min_length=1, max_length=100)
+    description: Optional[str] = Field(None, max_length=500)
+    deadline: Optional[datetime] = None
+    is_completed: Optional[bool] = None
+    version: Optional[int] = None
+
+    @field_validator("title", "is_completed")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("field cannot be null")
+        return value
+
 # Схема для возврата данных 
 class TaskReadSchema(BaseModel):
     id: int
@@ -49,5 +71,77 @@ class TaskReadSchema(BaseModel):
     description: Optional[str]
     deadline: Optional[datetime]
     is_completed: bool
+    version: int = 1
     
     model_config = ConfigDict(from_attributes=True) # Позволяет Pydantic работать с моделями SQLAlchemy
+
+
+# Счётчики задач пользователя
+class TaskStatsSchema(BaseModel):
+    active: int
+    completed: int
+    overdue: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Параметры постраничной выборки задач (keyset-пагинация)
+class TaskPageQuery(BaseModel):
+    limit: Optional[int] = Field(None, ge=1, le=1000)
+    after_id: Optional[int] = None
+    after_deadline: Optional[datetime] = None
+    order_by: Literal["id", "deadline"] = "id"
+    stream: bool = False
+
+class TaskFilterQuery(TaskPageQuery):
+    is_completed: Optional[bool] = None
+
+# Полнотекстовый поиск: результаты по релевантности, страницы через offset
+class TaskSearchQuery(BaseModel):
+    q: str = Field(..., min_length=1, max_length=200)
+    limit: int = Field(20, ge=1, le=100)
+    offset: int = Field(0, ge=0, le=1000)
+
+
+# Пакетные операции над задачами (одна транзакция)
+BULK_MAX_ITEMS = 1000
+
+class TaskBulkCreateItem(BaseModel):
+    title: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = Field(None, max_length=500)
+    deadline: Optional[datetime] = None
+
+class TaskBulkUpdateItem(BaseModel):
+    # Меняются только переданные поля; deadline: null снимает срок
+    id: int
+    title: Optional[str] = Field(None, min_length=1, max_length=100)
+    description: Optional[str] = Field(None, max_length=500)
+    deadline: Optional[datetime] = None
+    is_completed: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def check_has_changes(self):
+        if not self.model_fields_set - {"id"}:
+            raise ValueError("update item has no fields to change")
+        return self
+
+class TaskBulkSchema(BaseModel):
+    username: str
+    create: List[TaskBulkCreateItem] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    update: List[TaskBulkUpdateItem] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    complete: List[int] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    delete: List[int] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+
+class TaskBulkItemResult(BaseModel):
+    op: Literal["create", "update", "complete", "delete"]
+    id: Optional[int] = None
+    status: Literal["created", "updated", "completed", "deleted", "not_found", "skipped"]
+
+class TaskBulkResultSchema(BaseModel):
+    results: List[TaskBulkItemResult]
+    created: int = 0
+    updated: int = 0
+    completed: int = 0
+    deleted: int = 0
+    not_found: int = 0
+    skipped: int = 0
@@ -0,0 +1,154 @@
+"""Запуск бэкенда в проде: python -m backend.server
+
+Несколько процессов uvicorn на одном сокете, без reload. Воркеры
+запускаются заново (spawn), поэтому общую разовую работу — сборку статики —
+делает главный процесс до их старта, а каждый воркер прогревается в
+lifespan и только потом начинает принимать соединения. uvloop и httptools
+берутся, если установлены. По SIGTERM/SIGINT воркер перестаёт принимать
+новые соединения и дожидается текущих запросов не дольше
+APP_GRACEFUL_TIMEOUT секунд.
+
+С несколькими воркерами общий кеш обязан быть в Redis (кеш в памяти у
+каждого процесса свой и отдавал бы устаревшие данные), поэтому без
+доступного Redis запуск отклоняется. Фоновые задачи (outbox, напоминания,
+сверка счётчиков) в воркерах выключены и работают в одном процессе
+backend.jobs, который запускается здесь же (APP_JOBS_PROCESS=0 — если он
+запущен отдельно).
+"""
+import importlib.util
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+
+env_path = Path(__file__).resolve().parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("APP_HOST", "127.0.0.1")
+PORT = int(os.getenv("APP_PORT", 8000))
+# По процессу на ядро; у каждого свои пулы БД и свой реестр метрик
+WORKERS = int(os.getenv("APP_WORKERS") or os.cpu_count() or 1)
+GRACEFUL_TIMEOUT = int(os.getenv("APP_GRACEFUL_TIMEOUT", 30))
+KEEPALIVE_TIMEOUT = int(os.getenv("APP_KEEPALIVE_TIMEOUT", 5))
+BACKLOG = int(os.getenv("APP_BACKLOG", 2048))
+# Пусто — без лимита; при превышении uvicorn отвечает 503, а не копит запросы
+LIMIT_CONCURRENCY = int(os.getenv("APP_LIMIT_CONCURRENCY") or 0) or None
+ACCESS_LOG = os.getenv("APP_ACCESS_LOG", "0") == "1"
+# 1 — запускать backend.jobs дочерним процессом при нескольких воркерах
+JOBS_PROCESS = os.getenv("APP_JOBS_PROCESS", "1") == "1"
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def pick_loop() -> str:
+    return os.getenv("APP_LOOP") or ("uvloop" if _available("uvloop") else "asyncio")
+
+
+def pick_http() -> str:
+    return os.getenv("APP_HTTP") or ("httptools" if _available("httptools") else "h11")
+
+
+def prepare_environment():
+    """Прод-настройки по умолчанию; наследуются воркерами через окружение."""
+    os.environ.setdefault("DB_PROFILE", "prod")
+    os.environ.setdefault("TEMPLATES_AUTO_RELOAD", "0")
+
+
+def check_shared_cache(workers: int):
+    """Несколько воркеров: общий кеш только в Redis, и он должен отвечать."""
+    os.environ["APP_WORKERS"] = str(workers)
+    if workers == 1:
+        return
+    # Через pub/sub кеша до backend.jobs доходят и новые сроки напоминаний
+    backend = os.getenv("SHARED_CACHE_BACKEND") or "redis"
+    if backend != "redis":
+        raise SystemExit(f"SHARED_CACHE_BACKEND={backend} is not shared between processes; use redis with APP_WORKERS > 1")
+
+    import redis
+
+    from backend.services.shared_cache import REDIS_URL
+
+    client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=5)
+    try:
+        client.ping()
+    except redis.RedisError as e:
+        raise SystemExit(f"Redis at {REDIS_URL} is required for {workers} workers: {e}")
+    finally:
+        client.close()
+
+
+def start_jobs_process(workers: int):
+    """Выключает фоновые задачи в воркерах и запускает их одним процессом."""
+    if workers == 1:
+        return None
+    os.environ["APP_BACKGROUND_JOBS"] = "0"
+    if not JOBS_PROCESS:
+        logger.info("Background jobs are expected in a separate python -m backend.jobs")
+        return None
+    env = dict(os.environ, APP_BACKGROUND_JOBS="1")
+    return subprocess.Popen([sys.executable, "-m", "backend.jobs"], env=env)
+
+
+def stop_jobs_process(process):
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=GRACEFUL_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def prebuild_assets():
+    from backend.services.assets import build_assets
+
+    manifest = build_assets()
+    # Воркеры только читают манифест, а не пересобирают .gz/.br каждый
+    os.environ["ASSETS_BUILD_ON_START"] = "0"
+    return manifest
+
+
+def run(workers: int = WORKERS, host: str = HOST, port: int = PORT):
+    prepare_environment()
+    check_shared_cache(workers)
+    manifest = prebuild_assets()
+    loop, http = pick_loop(), pick_http()
+    logger.info(f"Starting {workers} worker(s) on {host}:{port}, loop={loop}, http={http}, assets={len(manifest)}")
+    jobs = start_jobs_process(workers)
+    try:
+        uvicorn.run(
+            "backend.main:app",
+            host=host,
+            port=port,
+            workers=workers,
+            reload=False,
+            loop=loop,
+            http=http,
+            backlog=BACKLOG,
+            timeout_keep_alive=KEEPALIVE_TIMEOUT,
+            timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+            limit_concurrency=LIMIT_CONCURRENCY,
+            access_log=ACCESS_LOG,
+        )
+    finally:
+        stop_jobs_process(jobs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Запуск бэкенда в проде")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    run(workers=args.workers, host=args.host, port=args.port)
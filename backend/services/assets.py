@@ -0,0 +1,158 @@
+"""Статика с отпечатками содержимого и заранее сжатыми вариантами.
+
+build_assets() копирует backend/static в каталог сборки под именами вида
+styles.<hash>.css, рядом кладёт .gz (и .br, если установлен brotli) и пишет
+manifest.json. Шаблоны ссылаются на файлы через asset_url(), поэтому
+отпечатанные URL можно кэшировать навсегда. Запускается при старте
+приложения или заранее: python -m backend.services.assets
+"""
+import gzip
+import hashlib
+import json
+import os
+import stat
+from pathlib import Path
+from typing import Dict, Optional
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+try:
+    import brotli
+except ImportError:  # brotli не обязателен: без него отдаём только gzip
+    brotli = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = BASE_DIR / "static"
+ASSETS_BUILD_DIR = Path(os.getenv("ASSETS_BUILD_DIR", BASE_DIR / "static_build"))
+MANIFEST_NAME = "manifest.json"
+
+# Картинки и шрифты уже сжаты, повторное сжатие только тратит CPU
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".map", ".svg", ".html", ".txt", ".json", ".xml"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_manifest: Optional[Dict[str, str]] = None
+_fingerprinted: frozenset = frozenset()
+
+
+def _write_atomic(path: Path, data: bytes):
+    # Несколько воркеров могут собирать одновременно: пишем во временный файл и подменяем
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _write_variants(path: Path, data: bytes):
+    _write_atomic(path, data)
+    if path.suffix not in COMPRESSIBLE_SUFFIXES:
+        return
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        _write_atomic(path.with_name(path.name + ".gz"), compressed)
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            _write_atomic(path.with_name(path.name + ".br"), compressed)
+
+
+def build_assets(source: Path = STATIC_DIR, target: Path = ASSETS_BUILD_DIR) -> Dict[str, str]:
+    """Собирает статику и возвращает манифест {исходный путь: путь с отпечатком}."""
+    manifest = {}
+    for path in sorted(source.rglob("*")):
+        if not path.is_file():
+            continue
+        relative = path.relative_to(source)
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed = relative.with_name(f"{relative.stem}.{digest}{relative.suffix}")
+
+        # Файл с тем же отпечатком уже собран — содержимое не изменилось
+        if not (target / hashed).exists():
+            _write_variants(target / hashed, data)
+        # Исходное имя тоже отдаём (для старых ссылок), но с перепроверкой
+        _write_variants(target / relative, data)
+        manifest[relative.as_posix()] = hashed.as_posix()
+
+    _write_atomic(target / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _set_manifest(manifest)
+    return manifest
+
+
+def _set_manifest(manifest: Dict[str, str]):
+    global _manifest, _fingerprinted
+    _manifest = manifest
+    _fingerprinted = frozenset(manifest.values())
+
+
+def load_manifest(target: Path = ASSETS_BUILD_DIR) -> Dict[str, str]:
+    if _manifest is None:
+        try:
+            _set_manifest(json.loads((target / MANIFEST_NAME).read_text()))
+        except FileNotFoundError:
+            _set_manifest({})
+    return _manifest
+
+
+def is_fingerprinted(path: str) -> bool:
+    load_manifest()
+    return path.lstrip("/") in _fingerprinted
+
+
+def asset_url(path: str) -> str:
+    # Глобальная функция Jinja: {{ asset_url('css/styles.css') }}
+    path = path.lstrip("/")
+    return "/static/" + load_manifest().get(path, path)
+
+
+def _accepted_encodings(header: str) -> set:
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, отдающий готовый .br/.gz по Accept-Encoding.
+
+    Файлы с отпечатком получают Cache-Control: immutable, остальные —
+    no-cache с перепроверкой по ETag.
+    """
+
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    async def get_response(self, path: str, scope):
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        response = None
+        for encoding, suffix in self.ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = self.file_response(full_path, stat_result, scope)
+                response.headers["Content-Encoding"] = encoding
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["Vary"] = "Accept-Encoding"
+            response.headers["Cache-Control"] = (
+                IMMUTABLE_CACHE_CONTROL if is_fingerprinted(path) else REVALIDATE_CACHE_CONTROL
+            )
+        return response
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    print(f"Собрано файлов: {len(built)} -> {ASSETS_BUILD_DIR}")
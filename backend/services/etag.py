@@ -0,0 +1,41 @@
+"""Условные GET для списков задач.
+
+User.tasks_version растёт при каждом изменении задач пользователя, поэтому
+сильный ETag собирается из (user_id, версия, путь и параметры запроса) без
+чтения таблицы task. На совпавший If-None-Match отвечаем 304.
+"""
+import hashlib
+import os
+
+from fastapi import Request, Response
+
+# Меняется при выкладке, чтобы страницы со старыми шаблонами не считались свежими
+ETAG_SALT = os.getenv("APP_BUILD", "")
+
+
+def tasks_etag(request: Request, user_id: int, version: int) -> str:
+    params = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(f"{ETAG_SALT}|{request.url.path}|{params}".encode()).hexdigest()[:16]
+    return f'"{user_id}.{version}.{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Для If-None-Match сравнение слабое: W/ не учитываем
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Кэшировать можно, но каждый раз с перепроверкой по ETag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
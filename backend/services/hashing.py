@@ -0,0 +1,72 @@
+"""Хеширование паролей вне event loop.
+
+bcrypt отпускает GIL на время вычисления, поэтому ограниченного пула
+потоков достаточно, чтобы хеширование шло параллельно и не блокировало
+остальные запросы воркера. Очередь ограничена: при переполнении сразу
+выбрасывается HasherBusy, а не копятся ожидающие логины.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", 32))
+# Перехешировать пароль при входе, если он сохранён с другим cost
+REHASH_ON_LOGIN = os.getenv("REHASH_ON_LOGIN", "1") == "1"
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.context = context
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, func, *args):
+        # Счётчик меняется только из event loop, блокировка не нужна
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Проверяет пароль и, если хеш устарел, возвращает новый."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    async def warm_up(self):
+        """Загружает backend bcrypt и заранее поднимает все потоки пула."""
+        self.context.handler().get_backend()
+        loop = asyncio.get_running_loop()
+        # Потоки создаются по одному на задачу, пока все заняты — занимаем каждый
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, time.sleep, 0.01) for _ in range(self.workers)
+        ))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(pwd_context)
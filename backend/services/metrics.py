@@ -0,0 +1,267 @@
+"""Метрики приложения в текстовом формате Prometheus.
+
+Реестр живёт в памяти процесса и не требует внешнего Prometheus:
+/metrics отдаёт текстовый формат, /metrics/summary — оценки p50/p95/p99
+по гистограммам в JSON для локальной проверки.
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [счётчики по корзинам (+Inf последней), сумма, количество]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def quantile(self, q: float, key: Tuple[str, ...]) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины."""
+        counts, _, total = self.series[key]
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+    def render(self) -> list:
+        lines = self.header()
+        for key, (counts, total_sum, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def summary(self) -> list:
+        return [
+            {
+                "labels": dict(zip(self.labelnames, key)),
+                "count": count,
+                "avg": total_sum / count if count else 0.0,
+                "p50": self.quantile(0.5, key),
+                "p95": self.quantile(0.95, key),
+                "p99": self.quantile(0.99, key),
+            }
+            for key, (_, total_sum, count) in self.series.items()
+        ]
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        return {
+            name: metric.summary()
+            for name, metric in self.metrics.items()
+            if isinstance(metric, Histogram)
+        }
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by router, method and status.",
+    ("router", "method", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by router.", ("router",),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("router",),
+))
+db_session_acquire_seconds = registry.register(Histogram(
+    "db_session_acquire_seconds", "Time to check out a DB connection for a request.", ("engine",),
+))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time.",
+))
+bot_send_duration_seconds = registry.register(Histogram(
+    "bot_send_duration_seconds", "bot.send_message latency.",
+))
+bot_send_errors_total = registry.register(Counter(
+    "bot_send_errors_total", "bot.send_message failures by exception type.", ("error",),
+))
+reminders_sent_total = registry.register(Counter(
+    "reminders_sent_total", "Deadline reminders enqueued by kind.", ("kind",),
+))
+task_stats_drift_total = registry.register(Counter(
+    "task_stats_drift_total", "Users whose task counters were corrected by the recheck job.",
+))
+bot_update_queue_depth = registry.register(Gauge(
+    "bot_update_queue_depth", "Bot updates accepted and not yet handled.",
+))
+bot_chat_queues = registry.register(Gauge(
+    "bot_chat_queues", "Chats with pending bot updates.",
+))
+bot_updates_rejected_total = registry.register(Counter(
+    "bot_updates_rejected_total", "Bot updates rejected by the dispatch layer.", ("reason",),
+))
+bot_submit_wait_seconds = registry.register(Histogram(
+    "bot_submit_wait_seconds", "Time an update waited for a free slot (backpressure).",
+))
+bot_update_wait_seconds = registry.register(Histogram(
+    "bot_update_wait_seconds", "Time an update spent queued before a worker picked it up.",
+))
+bot_update_duration_seconds = registry.register(Histogram(
+    "bot_update_duration_seconds", "Bot update handling time.",
+))
+shared_cache_requests_total = registry.register(Counter(
+    "shared_cache_requests_total", "Shared read cache lookups by tier and result.", ("tier", "result"),
+))
+app_warmup_seconds = registry.register(Gauge(
+    "app_warmup_seconds", "Worker warm-up time by step.", ("step",),
+))
+
+# Префиксы роутеров со слешем: /users/ и /tasks/ — это веб-страницы
+ROUTER_PREFIXES = (
+    ("/auth/", "auth"),
+    ("/user/", "user"),
+    ("/task/", "task"),
+    ("/static/", "static"),
+    ("/metrics", "metrics"),
+)
+
+
+def router_label(path: str) -> str:
+    for prefix, name in ROUTER_PREFIXES:
+        if path.startswith(prefix):
+            return name
+    return "web"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        router = router_label(scope["path"])
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(router=router)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration_seconds.observe(time.perf_counter() - start, router=router)
+            http_requests_in_flight.dec(router=router)
+            http_requests_total.inc(router=router, method=scope["method"], status=status_code)
@@ -0,0 +1,283 @@
+"""Transactional outbox для уведомлений в Telegram.
+
+Роуты только пишут строку OutboxMessage в своей транзакции
+(enqueue_notification), а OutboxDispatcher в фоне забирает пачки из таблицы
+и отправляет их через бота с учётом лимитов Telegram.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+)
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from backend.database.database import AsyncSessionLocal
+from backend.models.models import OutboxMessage
+from backend.services.metrics import bot_send_duration_seconds, bot_send_errors_total
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram: ~30 сообщений/с на бота и ~1 сообщение/с в один чат
+GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", 30))
+CHAT_RATE = float(os.getenv("OUTBOX_CHAT_RATE", 1))
+CHAT_BURST = int(os.getenv("OUTBOX_CHAT_BURST", 1))
+
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 2))
+LEASE_SECONDS = 60
+# Запас до конца аренды на саму отправку и запись результата
+LEASE_MARGIN = 10
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 600.0
+MAX_CHAT_BUCKETS = 10_000
+
+# Ошибки, после которых повторять бесполезно (бот заблокирован, чат не существует)
+PERMANENT_ERRORS = (TelegramForbiddenError, TelegramNotFound, TelegramBadRequest)
+
+
+def enqueue_notification(db: AsyncSession, chat_id: int, text: str, parse_mode: Optional[str] = None):
+    # Строка уйдёт в базу вместе с остальными изменениями при db.commit()
+    db.add(OutboxMessage(chat_id=chat_id, text=text, parse_mode=parse_mode))
+
+
+def claim_query(now: datetime, batch_size: int = BATCH_SIZE):
+    # Аренда строк через UPDATE ... RETURNING: другой воркер их не возьмёт,
+    # а после падения процесса они снова станут доступны через LEASE_SECONDS
+    earlier = aliased(OutboxMessage)
+    # Сообщение не берём, пока в том же чате ждёт более раннее — порядок сохраняется
+    blocked = (
+        select(earlier.id)
+        .where(
+            earlier.chat_id == OutboxMessage.chat_id,
+            earlier.id < OutboxMessage.id,
+            earlier.failed_at.is_(None),
+            earlier.next_attempt_at > now,
+        )
+        .exists()
+    )
+    pending = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.failed_at.is_(None), OutboxMessage.next_attempt_at <= now, ~blocked)
+        .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+        .limit(batch_size)
+    )
+    return (
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(pending.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=LEASE_SECONDS))
+        .returning(
+            OutboxMessage.id, OutboxMessage.chat_id, OutboxMessage.text,
+            OutboxMessage.parse_mode, OutboxMessage.attempts
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """Берёт токен; если его нет — возвращает, сколько секунд ждать."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def take(self):
+        while (wait := self.try_take()) > 0:
+            await asyncio.sleep(wait)
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+def backoff_delay(attempts: int) -> float:
+    # Экспоненциальная задержка с джиттером, чтобы повторы не шли синхронно
+    delay = min(BACKOFF_MAX, BACKOFF_BASE ** attempts)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class OutboxDispatcher:
+    def __init__(self, sessionmaker=AsyncSessionLocal, batch_size: int = BATCH_SIZE):
+        self.sessionmaker = sessionmaker
+        self.batch_size = batch_size
+        self.bot = None
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+    def wakeup(self):
+        self._wakeup.set()
+
+    async def start(self, bot):
+        self.bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="outbox-dispatcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox dispatcher iteration failed")
+                processed = 0
+            if processed < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _claim(self, now: datetime):
+        async with self.sessionmaker() as db:
+            result = await db.execute(claim_query(now, self.batch_size))
+            rows = sorted(result.all(), key=lambda row: row.id)
+            await db.commit()
+        return rows
+
+    async def drain_once(self) -> int:
+        # Во время RetryAfter новые строки не арендуем: ждём, ничего не удерживая
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        rows = await self._claim(datetime.utcnow())
+        if not rows:
+            return 0
+        lease_deadline = time.monotonic() + LEASE_SECONDS - LEASE_MARGIN
+
+        by_chat = defaultdict(list)
+        for row in rows:
+            by_chat[row.chat_id].append(row)
+
+        sent: list[int] = []
+        retries: dict[int, dict] = {}
+        await asyncio.gather(*(
+            self._send_chat(chat_rows, sent, retries, lease_deadline) for chat_rows in by_chat.values()
+        ))
+        await self._finish(sent, retries)
+        self._prune_buckets()
+        return len(rows)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(CHAT_RATE, CHAT_BURST)
+        return bucket
+
+    async def _send_chat(self, rows, sent: list, retries: dict, lease_deadline: float):
+        # Сообщения одного чата уходят строго по порядку
+        bucket = self._chat_bucket(rows[0].chat_id)
+        for index, row in enumerate(rows):
+            wait = bucket.try_take()
+            if wait > 0:
+                # Лимит чата исчерпан: откладываем остаток, не тратя попытки
+                now = datetime.utcnow()
+                for offset, rest in enumerate(rows[index:]):
+                    retries[rest.id] = {
+                        "next_attempt_at": now + timedelta(seconds=wait + offset / CHAT_RATE)
+                    }
+                return
+
+            if not await self._wait_global(lease_deadline):
+                # Пауза переживёт аренду: отпускаем остаток чата, иначе другой
+                # диспетчер заберёт эти строки и отправит их повторно
+                resume_at = datetime.utcnow() + timedelta(seconds=self._paused_until - time.monotonic())
+                for rest in rows[index:]:
+                    retries[rest.id] = {"next_attempt_at": resume_at}
+                return
+            try:
+                kwargs = {"parse_mode": row.parse_mode} if row.parse_mode else {}
+                with bot_send_duration_seconds.time():
+                    await self.bot.send_message(row.chat_id, row.text, **kwargs)
+            except TelegramRetryAfter as e:
+                bot_send_errors_total.inc(error=type(e).__name__)
+                self._paused_until = time.monotonic() + e.retry_after
+                retries[row.id] = self._retry(row, e, delay=e.retry_after)
+            except PERMANENT_ERRORS as e:
+                bot_send_errors_total.inc(error=type(e).__name__)
+                retries[row.id] = self._retry(row, e, permanent=True)
+            except Exception as e:
+                bot_send_errors_total.inc(error=type(e).__name__)
+                retries[row.id] = self._retry(row, e)
+            else:
+                sent.append(row.id)
+                continue
+            # После ошибки остальные сообщения чата ждут своей очереди
+            for rest in rows[index + 1:]:
+                retries[rest.id] = {"next_attempt_at": retries[row.id].get("next_attempt_at", datetime.utcnow())}
+            return
+
+    async def _wait_global(self, lease_deadline: float) -> bool:
+        """Ждёт глобальный лимит; False — пауза не уложится в аренду строк."""
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            if time.monotonic() + pause > lease_deadline:
+                return False
+            await asyncio.sleep(pause)
+        await self.global_bucket.take()
+        return True
+
+    def _retry(self, row, error: Exception, delay: Optional[float] = None, permanent: bool = False) -> dict:
+        attempts = row.attempts + 1
+        values = {"attempts": attempts, "last_error": str(error)[:500]}
+        if permanent or attempts >= MAX_ATTEMPTS:
+            logger.warning(f"Outbox message {row.id} to {row.chat_id} dropped: {error}")
+            values["failed_at"] = datetime.utcnow()
+        else:
+            delay = delay if delay is not None else backoff_delay(attempts)
+            values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+        return values
+
+    async def _finish(self, sent: list, retries: dict):
+        async with self.sessionmaker() as db:
+            if sent:
+                await db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(sent)))
+            if retries:
+                # ORM bulk UPDATE по первичному ключу — executemany одной пачкой
+                await db.execute(
+                    update(OutboxMessage),
+                    [{"id": message_id, **values} for message_id, values in retries.items()],
+                )
+            await db.commit()
+
+    def _prune_buckets(self):
+        if len(self.chat_buckets) > MAX_CHAT_BUCKETS:
+            for chat_id in [c for c, b in self.chat_buckets.items() if b.is_full()]:
+                del self.chat_buckets[chat_id]
+
+
+outbox_dispatcher = OutboxDispatcher()
@@ -0,0 +1,249 @@
+"""Напоминания о сроках задач.
+
+ReminderScheduler держит в памяти только ближайшее окно срабатываний (куча
+по времени) и читает его по частичным индексам по deadline, а не опрашивает
+всю таблицу. События двух видов: напоминание за REMINDER_LEAD_HOURS до срока
+и уведомление о просрочке в момент срока. Сообщения уходят через outbox;
+повторную отправку исключает условный UPDATE по reminded_at /
+overdue_notified_at в той же транзакции, поэтому несколько воркеров могут
+работать одновременно.
+
+Если планировщик работает в отдельном процессе (backend.jobs), schedule() из
+HTTP-воркеров до него не доходит: новые сроки он узнаёт из инвалидаций
+общего кеша (on_invalidate) и дочитывает окно только для этих пользователей.
+"""
+import asyncio
+import heapq
+import html
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+
+from backend.database.database import AsyncSessionLocal
+from backend.models.models import Task, User
+from backend.services.metrics import reminders_sent_total
+from backend.services.outbox import enqueue_notification, outbox_dispatcher
+from backend.services.shared_cache import tasks_version_key
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LEAD = timedelta(hours=float(os.getenv("REMINDER_LEAD_HOURS", 24)))
+# Сколько времени вперёд держим в памяти; окно перечитывается по его окончании
+REMINDER_WINDOW = timedelta(seconds=float(os.getenv("REMINDER_WINDOW_SECONDS", 3600)))
+REMINDER_WINDOW_LIMIT = int(os.getenv("REMINDER_WINDOW_LIMIT", 10_000))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", 500))
+REMINDER_RETRY_SECONDS = 5
+
+REMIND = "remind"
+OVERDUE = "overdue"
+# Вид события -> колонка-отметка
+MARKERS = {REMIND: Task.reminded_at, OVERDUE: Task.overdue_notified_at}
+
+
+def _offset(kind: str, lead: timedelta) -> timedelta:
+    return lead if kind == REMIND else timedelta(0)
+
+
+def window_query(
+    kind: str,
+    window_end: datetime,
+    lead: timedelta = REMINDER_LEAD,
+    limit: int = REMINDER_WINDOW_LIMIT,
+    user_ids: Optional[Set[int]] = None,
+):
+    # Условия совпадают с частичными индексами ix_task_reminder_pending/ix_task_overdue_pending
+    query = select(Task.id, Task.deadline).where(
+        Task.is_completed == False,  # noqa: E712
+        MARKERS[kind].is_(None),
+        Task.deadline <= window_end + _offset(kind, lead),
+    )
+    if user_ids:
+        query = query.where(Task.user_id.in_(user_ids))
+    return query.order_by(Task.deadline).limit(limit)
+
+
+def reminder_text(kind: str, rows) -> str:
+    if kind == REMIND:
+        lines = ["⏰ <b>Скоро срок задач:</b>\n"]
+        lines += [
+            f"📌 {html.escape(row.title)} — до {row.deadline.strftime('%d.%m.%Y %H:%M')}" for row in rows
+        ]
+    else:
+        lines = ["⚠️ <b>Просрочены задачи:</b>\n"]
+        lines += [
+            f"📌 {html.escape(row.title)} — срок был {row.deadline.strftime('%d.%m.%Y %H:%M')}" for row in rows
+        ]
+    return "\n".join(lines)
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        sessionmaker=AsyncSessionLocal,
+        lead: timedelta = REMINDER_LEAD,
+        window: timedelta = REMINDER_WINDOW,
+        window_limit: int = REMINDER_WINDOW_LIMIT,
+        batch_size: int = REMINDER_BATCH_SIZE,
+    ):
+        self.sessionmaker = sessionmaker
+        self.lead = lead
+        self.window = window
+        self.window_limit = window_limit
+        self.batch_size = batch_size
+        # (время срабатывания, id задачи, вид события)
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._window_end: Optional[datetime] = None
+        # Пользователи, чьи задачи изменились в других процессах
+        self._dirty_users: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, task_id: int, deadline: Optional[datetime]):
+        """Добавляет события задачи после создания или смены срока.
+
+        Устаревшие записи кучи не удаляем: их отсеет условный UPDATE при отправке.
+        """
+        if deadline is None or self._window_end is None:
+            return
+        for kind in MARKERS:
+            fire_at = deadline - _offset(kind, self.lead)
+            if fire_at <= self._window_end:
+                heapq.heappush(self._heap, (fire_at, task_id, kind))
+        self._wakeup.set()
+
+    def on_invalidate(self, keys: Optional[List[str]]):
+        """Слушатель shared_cache: задачи пользователей изменились в другом процессе."""
+        if self._window_end is None:
+            return
+        if keys is None:
+            # Инвалидации могли потеряться — перечитываем окно целиком
+            self._window_end = datetime.min
+        else:
+            prefix = tasks_version_key("")
+            self._dirty_users.update(int(key[len(prefix):]) for key in keys if key.startswith(prefix))
+        self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="reminder-scheduler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._window_end = None
+            self._dirty_users.clear()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+                # Окно перечитаем заново: куча могла разойтись с базой
+                self._window_end = None
+                await asyncio.sleep(REMINDER_RETRY_SECONDS)
+
+    async def tick(self):
+        now = datetime.utcnow()
+        if self._window_end is None or now >= self._window_end:
+            await self.load_window(now)
+        elif self._dirty_users:
+            await self.load_users(now)
+
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self._heap))
+        if due:
+            await self.deliver(due, now)
+            return
+
+        next_at = min(self._heap[0][0], self._window_end) if self._heap else self._window_end
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, (next_at - now).total_seconds()))
+        except asyncio.TimeoutError:
+            pass
+
+    async def load_window(self, now: datetime):
+        window_end = now + self.window
+        entries = []
+        async with self.sessionmaker() as db:
+            for kind in MARKERS:
+                offset = _offset(kind, self.lead)
+                result = await db.execute(window_query(kind, window_end, self.lead, self.window_limit))
+                rows = result.all()
+                if len(rows) == self.window_limit:
+                    # Окно не влезло в лимит: сужаем его до последнего прочитанного срока
+                    window_end = min(window_end, rows[-1].deadline - offset)
+                entries += [(row.deadline - offset, row.id, kind) for row in rows]
+        self._heap = [entry for entry in entries if entry[0] <= window_end]
+        heapq.heapify(self._heap)
+        self._window_end = window_end
+        self._dirty_users.clear()
+
+    async def load_users(self, now: datetime):
+        """Дочитывает в текущее окно события задач указанных пользователей."""
+        user_ids, self._dirty_users = self._dirty_users, set()
+        async with self.sessionmaker() as db:
+            for kind in MARKERS:
+                offset = _offset(kind, self.lead)
+                result = await db.execute(
+                    window_query(kind, self._window_end, self.lead, self.window_limit, user_ids)
+                )
+                for row in result.all():
+                    if row.deadline - offset <= self._window_end:
+                        heapq.heappush(self._heap, (row.deadline - offset, row.id, kind))
+
+    async def deliver(self, due, now: datetime) -> int:
+        ids_by_kind = defaultdict(set)
+        for _, task_id, kind in due:
+            ids_by_kind[kind].add(task_id)
+
+        chat_id = select(User.telegram_id).where(User.id == Task.user_id).scalar_subquery()
+        messages = defaultdict(list)
+        async with self.sessionmaker() as db:
+            for kind, ids in ids_by_kind.items():
+                marker = MARKERS[kind]
+                # Ставим отметку только тем, кто ещё не отмечен: второй воркер получит пустой RETURNING
+                result = await db.execute(
+                    update(Task)
+                    .where(
+                        Task.id.in_(ids),
+                        Task.is_completed == False,  # noqa: E712
+                        marker.is_(None),
+                        Task.deadline <= now + _offset(kind, self.lead),
+                    )
+                    .values({marker.key: now, "updated_at": Task.updated_at})
+                    .returning(Task.id, Task.title, Task.deadline, chat_id.label("chat_id"))
+                    .execution_options(synchronize_session=False)
+                )
+                for row in result.all():
+                    # Задача, созданная уже просроченной, получает только уведомление о просрочке
+                    if kind == REMIND and row.deadline <= now:
+                        continue
+                    if row.chat_id:
+                        messages[(row.chat_id, kind)].append(row)
+
+            # Одно сообщение на чат и вид события за пачку
+            for (chat, kind), rows in messages.items():
+                enqueue_notification(db, chat, reminder_text(kind, sorted(rows, key=lambda r: r.deadline)))
+                reminders_sent_total.inc(len(rows), kind=kind)
+            await db.commit()
+
+        if messages:
+            outbox_dispatcher.wakeup()
+        return sum(len(rows) for rows in messages.values())
+
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,280 @@
+"""Двухуровневый кеш горячих чтений, общий для воркеров.
+
+Первый уровень — TTLCache в памяти процесса, второй — Redis (или
+MemoryBackend в том же процессе: для одного воркера и для проверки без
+Redis). Изменения публикуют инвалидацию: ключи удаляются из второго уровня
+и через pub/sub вычищаются из первого уровня во всех воркерах.
+
+Что кешируется: пользователь по username и по telegram_id (с версией
+задач), версия задач по id и страницы списков задач. Ключ страницы
+содержит tasks_version, поэтому после изменения задач достаточно сбросить
+записи с версией — старые страницы больше не читаются и истекают по TTL.
+
+Инвалидация не удаляет ключ, а ставит на его место короткий tombstone, а
+запись в кеш идёт только в пустой ключ (SET NX). Так запрос, прочитавший
+базу до commit, не вернёт старое значение в кеш сразу после инвалидации:
+пока живёт tombstone, его запись отклоняется.
+
+SHARED_CACHE_BACKEND: memory (один воркер), redis (несколько воркеров; по
+умолчанию при APP_WORKERS > 1), off. Ошибки Redis считаются промахом:
+запрос уходит в базу.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Iterable, List, Optional
+
+import orjson
+
+from backend.services.cache import TTLCache
+from backend.services.metrics import shared_cache_requests_total
+
+logger = logging.getLogger(__name__)
+
+# memory виден только своему процессу: с несколькими воркерами нужен общий Redis
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND") or (
+    "redis" if int(os.getenv("APP_WORKERS") or 1) > 1 else "memory"
+)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SHARED_CACHE_TTL = int(os.getenv("SHARED_CACHE_TTL", 300))
+# Короче TTL второго уровня: страховка на случай потерянной инвалидации
+SHARED_CACHE_LOCAL_TTL = float(os.getenv("SHARED_CACHE_LOCAL_TTL", 30))
+SHARED_CACHE_SIZE = int(os.getenv("SHARED_CACHE_SIZE", 10000))
+# Дольше любого запроса, который мог прочитать базу до commit
+SHARED_CACHE_TOMBSTONE_TTL = int(os.getenv("SHARED_CACHE_TOMBSTONE_TTL", 10))
+
+CHANNEL = "cache:invalidate"
+KEY_PREFIX = "cache:"
+# Значение-метка инвалидированного ключа; orjson и страницы задач так не начинаются
+TOMBSTONE = b"\x00tombstone"
+
+
+def user_by_name_key(username: str) -> str:
+    return f"user:name:{username}"
+
+
+def user_by_tg_key(telegram_id: int) -> str:
+    return f"user:tg:{telegram_id}"
+
+
+def tasks_version_key(user_id: int) -> str:
+    return f"tasks_version:{user_id}"
+
+
+def tasks_page_key(user_id: int, version: int, *params) -> str:
+    return f"tasks:{user_id}:{version}:" + ":".join(map(str, params))
+
+
+def user_keys(user_id: int, username: Optional[str] = None, telegram_id: Optional[int] = None) -> List[str]:
+    keys = [tasks_version_key(user_id)]
+    if username:
+        keys.append(user_by_name_key(username))
+    if telegram_id:
+        keys.append(user_by_tg_key(telegram_id))
+    return keys
+
+
+class MemoryBackend:
+    """Второй уровень и pub/sub в памяти процесса — замена Redis."""
+
+    def __init__(self):
+        self.data = {}
+        self.subscribers: List[Callable] = []
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            self.data.pop(key, None)
+            return None
+        return item[1]
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        # Как SET NX: занятый ключ (в том числе tombstone) не перезаписывается
+        if await self.get(key) is None:
+            self.data[key] = (time.monotonic() + ttl, value)
+
+    async def bury(self, keys: List[str], ttl: int):
+        for key in keys:
+            self.data[key] = (time.monotonic() + ttl, TOMBSTONE)
+
+    async def publish(self, keys: List[str]):
+        for callback in self.subscribers:
+            callback(keys)
+
+    async def start(self, on_invalidate: Callable):
+        self.subscribers.append(on_invalidate)
+
+    async def stop(self):
+        self.subscribers.clear()
+
+
+class RedisBackend:
+    def __init__(self, url: str = REDIS_URL):
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(url)
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(KEY_PREFIX + key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.redis.set(KEY_PREFIX + key, value, ex=ttl, nx=True)
+
+    async def bury(self, keys: List[str], ttl: int):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(KEY_PREFIX + key, TOMBSTONE, ex=ttl)
+            await pipe.execute()
+
+    async def publish(self, keys: List[str]):
+        await self.redis.publish(CHANNEL, orjson.dumps(keys))
+
+    async def start(self, on_invalidate: Callable):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(on_invalidate), name="shared-cache-invalidation")
+
+    async def _listen(self, on_invalidate: Callable):
+        from redis.exceptions import RedisError
+
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                # Пока подписки не было, инвалидации могли потеряться
+                on_invalidate(None)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        on_invalidate(orjson.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                logger.warning(f"Cache invalidation channel lost: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.redis.aclose()
+
+
+def create_backend(kind: str = SHARED_CACHE_BACKEND):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "redis":
+        return RedisBackend()
+    if kind == "off":
+        return None
+    raise ValueError(f"Unknown SHARED_CACHE_BACKEND: {kind}")
+
+
+class SharedCache:
+    def __init__(
+        self,
+        backend=None,
+        ttl: int = SHARED_CACHE_TTL,
+        local_ttl: float = SHARED_CACHE_LOCAL_TTL,
+        maxsize: int = SHARED_CACHE_SIZE,
+        tombstone_ttl: int = SHARED_CACHE_TOMBSTONE_TTL,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self.local = TTLCache(maxsize, local_ttl)
+        # Те же tombstone для первого уровня: ключ -> метка, всё -> _buried_all_until
+        self.tombstones = TTLCache(maxsize, tombstone_ttl)
+        self._buried_all_until = 0.0
+        self.listeners: List[Callable] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def start(self):
+        if self.backend is not None:
+            await self.backend.start(self._on_invalidate)
+
+    async def stop(self):
+        if self.backend is not None:
+            await self.backend.stop()
+
+    def add_listener(self, callback: Callable):
+        """callback(keys) после каждой инвалидации; keys=None — сброшено всё."""
+        self.listeners.append(callback)
+
+    def _on_invalidate(self, keys: Optional[List[str]]):
+        if keys is None:
+            self.local.clear()
+            self._buried_all_until = time.monotonic() + self.tombstone_ttl
+        else:
+            for key in keys:
+                self.local.pop(key)
+                self.tombstones.set(key, True)
+        for callback in self.listeners:
+            callback(keys)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self.backend is None:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            shared_cache_requests_total.inc(tier="local", result="hit")
+            return value
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return None
+        if value is None or value == TOMBSTONE:
+            shared_cache_requests_total.inc(tier="shared", result="miss")
+            return None
+        shared_cache_requests_total.inc(tier="shared", result="hit")
+        self._set_local(key, value)
+        return value
+
+    def _set_local(self, key: str, value: bytes):
+        # Значение могли прочитать до инвалидации, пришедшей, пока шёл запрос
+        if self.tombstones.get(key) is None and time.monotonic() >= self._buried_all_until:
+            self.local.set(key, value)
+
+    async def set(self, key: str, value: bytes):
+        if self.backend is None:
+            return
+        self._set_local(key, value)
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    async def get_json(self, key: str):
+        value = await self.get(key)
+        return None if value is None else orjson.loads(value)
+
+    async def set_json(self, key: str, value):
+        await self.set(key, orjson.dumps(value))
+
+    async def invalidate(self, keys: Iterable[str]):
+        """Вызывать после commit: иначе другой воркер успеет закешировать старое."""
+        keys = list(keys)
+        self._on_invalidate(keys)
+        if self.backend is None:
+            return
+        try:
+            await self.backend.bury(keys, self.tombstone_ttl)
+            await self.backend.publish(keys)
+        except Exception as e:
+            logger.warning(f"Shared cache invalidation failed: {e}")
+
+    def stats(self) -> dict:
+        return {"backend": type(self.backend).__name__ if self.backend else "off", **self.local.stats()}
+
+
+shared_cache = SharedCache(create_backend())
@@ -0,0 +1,156 @@
+"""Счётчики задач пользователя и их периодическая сверка.
+
+Сами счётчики ведут триггеры на task (backend/database/stats_triggers.py),
+здесь — чтение одной строкой по первичному ключу и фоновая сверка с таблицей
+task на случай расхождений (ручные правки базы, восстановление из копии).
+Число просроченных задач читается по deadline на момент запроса, а не из
+счётчика overdue: тот следует за отметкой планировщика напоминаний и
+отстаёт, пока backend.jobs не запущен.
+Разовая сверка: python -m backend.services.task_stats
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Row, and_, case, exists, func, or_, select, true, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database.database import AsyncSessionLocal
+from backend.models.models import Task, User, UserTaskStats
+from backend.services.metrics import task_stats_drift_total
+
+logger = logging.getLogger(__name__)
+
+TASK_STATS_RECHECK_SECONDS = float(os.getenv("TASK_STATS_RECHECK_SECONDS", 3600))
+
+STATS_COLUMNS = ("active", "completed", "overdue")
+
+
+def task_stats_query(telegram_id: int, now: Optional[datetime] = None):
+    # Просрочку считаем по сроку на момент чтения (частичный индекс активных задач):
+    # счётчик overdue меняется, только когда планировщик ставит отметку
+    overdue = (
+        select(func.count())
+        .select_from(Task)
+        .where(
+            Task.user_id == User.id,
+            Task.is_completed == False,  # noqa: E712
+            Task.deadline < (now or datetime.utcnow()),
+        )
+        .scalar_subquery()
+    )
+    return (
+        select(
+            *(func.coalesce(getattr(UserTaskStats, name), 0).label(name) for name in ("active", "completed")),
+            overdue.label("overdue"),
+        )
+        .select_from(User)
+        .outerjoin(UserTaskStats, UserTaskStats.user_id == User.id)
+        .where(User.telegram_id == telegram_id)
+    )
+
+
+async def get_task_stats_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[Row]:
+    """(active, completed, overdue) пользователя или None, если его нет."""
+    result = await db.execute(task_stats_query(telegram_id))
+    return result.first()
+
+
+def _actual_counts():
+    active = Task.is_completed == False  # noqa: E712
+    return (
+        select(
+            Task.user_id,
+            func.sum(case((active, 1), else_=0)),
+            func.sum(case((Task.is_completed == True, 1), else_=0)),  # noqa: E712
+            func.sum(case((and_(active, Task.overdue_notified_at.is_not(None)), 1), else_=0)),
+        )
+        # WHERE обязателен: иначе SQLite спутает ON CONFLICT с ON у JOIN
+        .where(true())
+        .group_by(Task.user_id)
+    )
+
+
+async def recheck_task_stats(db: AsyncSession) -> List[int]:
+    """Пересчитывает счётчики по task и исправляет расхождения.
+
+    Каждое исправление — один атомарный запрос, поэтому сверку можно
+    запускать на живой базе. Возвращает id пользователей с расхождениями.
+    """
+    upsert = sqlite_insert(UserTaskStats).from_select(["user_id", *STATS_COLUMNS], _actual_counts())
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[UserTaskStats.user_id],
+        set_={name: getattr(upsert.excluded, name) for name in STATS_COLUMNS},
+        where=or_(*(getattr(UserTaskStats, name) != getattr(upsert.excluded, name) for name in STATS_COLUMNS)),
+    ).returning(UserTaskStats.user_id)
+    fixed = list((await db.execute(upsert)).scalars())
+
+    # У пользователей без задач все счётчики нулевые
+    emptied = await db.execute(
+        update(UserTaskStats)
+        .where(
+            ~exists(select(Task.id).where(Task.user_id == UserTaskStats.user_id)),
+            or_(*(getattr(UserTaskStats, name) != 0 for name in STATS_COLUMNS)),
+        )
+        .values({name: 0 for name in STATS_COLUMNS})
+        .returning(UserTaskStats.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    fixed += list(emptied.scalars())
+    await db.commit()
+    return fixed
+
+
+class TaskStatsChecker:
+    def __init__(self, sessionmaker=AsyncSessionLocal, interval: float = TASK_STATS_RECHECK_SECONDS):
+        self.sessionmaker = sessionmaker
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="task-stats-checker")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def check_once(self) -> List[int]:
+        async with self.sessionmaker() as db:
+            fixed = await recheck_task_stats(db)
+        if fixed:
+            task_stats_drift_total.inc(len(fixed))
+            logger.warning(f"Task stats drift fixed for {len(fixed)} users: {fixed[:20]}")
+        return fixed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Task stats recheck failed")
+
+
+task_stats_checker = TaskStatsChecker()
+
+
+if __name__ == "__main__":
+    from backend.database.database import dispose_engines
+
+    async def _main():
+        fixed = await task_stats_checker.check_once()
+        await dispose_engines()
+        print(f"Исправлено пользователей: {len(fixed)}")
+
+    asyncio.run(_main())
@@ -0,0 +1,465 @@
+"""Запросы к задачам, общие для HTTP-роутов и бота.
+
+Функции принимают AsyncSession и сами фиксируют транзакцию, поэтому их
+можно вызывать как из FastAPI-обработчиков, так и напрямую из бота без
+лишнего HTTP-перехода.
+"""
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+from sqlalchemy import Row, and_, delete, func, insert, literal_column, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database.fts import TASK_FTS_TABLE, TASK_FTS_WEIGHTS, fts_match, task_fts
+from backend.models.models import Task, User
+from backend.services.outbox import enqueue_notification, outbox_dispatcher
+from backend.services.reminders import reminder_scheduler
+from backend.services.shared_cache import shared_cache, tasks_version_key, user_by_tg_key, user_keys
+from backend.services.users import UserIdentity
+
+PAGE_SIZE_DEFAULT = 100
+# Поля TaskReadSchema: списки читаются кортежами, без сборки ORM-объектов
+TASK_READ_COLUMNS = (Task.id, Task.title, Task.description, Task.deadline, Task.is_completed, Task.version)
+
+
+def tasks_query(
+    user_id: int,
+    is_completed: Optional[bool] = None,
+    order_by: str = "id",
+    after_id: Optional[int] = None,
+    after_deadline: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    columns: Optional[tuple] = None,
+):
+    query = select(*columns) if columns else select(Task)
+    query = query.where(Task.user_id == user_id)
+    if is_completed is not None:
+        query = query.where(Task.is_completed == is_completed)
+
+    if order_by == "deadline":
+        # Курсор (deadline, id); задачи без срока SQLite отдаёт первыми
+        if after_id is not None:
+            if after_deadline is None:
+                query = query.where(or_(
+                    Task.deadline.is_not(None),
+                    and_(Task.deadline.is_(None), Task.id > after_id),
+                ))
+            else:
+                query = query.where(or_(
+                    Task.deadline > after_deadline,
+                    and_(Task.deadline == after_deadline, Task.id > after_id),
+                ))
+        query = query.order_by(Task.deadline, Task.id)
+    else:
+        if after_id is not None:
+            query = query.where(Task.id > after_id)
+        query = query.order_by(Task.id)
+
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def next_cursor(tasks: List, limit: int, order_by: str = "id") -> Optional[str]:
+    # Курсор нужен, только если страница заполнена целиком
+    if len(tasks) < limit:
+        return None
+    last = tasks[-1]
+    cursor = f"after_id={last.id}"
+    if order_by == "deadline" and last.deadline is not None:
+        cursor += f"&after_deadline={last.deadline.isoformat()}"
+    return cursor
+
+
+# Построители запросов ниже используются и сервисом, и проверкой планов
+# (backend/database/query_plan.py), чтобы проверялись ровно те запросы, что выполняются
+
+def user_id_query(telegram_id: int):
+    return select(User.id).where(User.telegram_id == telegram_id)
+
+
+def user_version_query(telegram_id: int):
+    return select(User.id, User.tasks_version).where(User.telegram_id == telegram_id)
+
+
+def tasks_version_query(user_id: int):
+    return select(User.tasks_version).where(User.id == user_id)
+
+
+def task_query(task_id: int, user_id: Optional[int] = None):
+    query = select(Task).where(Task.id == task_id)
+    if user_id is not None:
+        query = query.where(Task.user_id == user_id)
+    return query
+
+
+def owned_task_ids_query(user_id: int, task_ids: Iterable[int]):
+    return select(Task.id).where(Task.user_id == user_id, Task.id.in_(list(task_ids)))
+
+
+def patch_task_query(
+    task_id: int, values: dict, expected_version: Optional[int] = None, user_id: Optional[int] = None
+):
+    """UPDATE ... RETURNING (задача, chat id владельца) для patch_task."""
+    telegram_id = select(User.telegram_id).where(User.id == Task.user_id).scalar_subquery()
+    # Новый срок — новые напоминания
+    markers = {"reminded_at": None, "overdue_notified_at": None} if "deadline" in values else {}
+    query = (
+        update(Task)
+        .where(Task.id == task_id)
+        .values(**values, **markers, version=Task.version + 1)
+        .returning(Task, telegram_id)
+    )
+    if user_id is not None:
+        query = query.where(Task.user_id == user_id)
+    if expected_version is not None:
+        query = query.where(Task.version == expected_version)
+    return query
+
+
+async def get_user_id_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[int]:
+    result = await db.execute(user_id_query(telegram_id))
+    return result.scalar_one_or_none()
+
+
+class UserVersion(NamedTuple):
+    id: int
+    tasks_version: int
+
+
+async def get_user_version_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[UserVersion]:
+    """(id, tasks_version) пользователя или None; через общий кеш."""
+    key = user_by_tg_key(telegram_id)
+    cached = await shared_cache.get_json(key)
+    if cached is not None:
+        return UserVersion(*cached)
+    row = (await db.execute(user_version_query(telegram_id))).first()
+    if row is None:
+        return None
+    await shared_cache.set_json(key, list(row))
+    return UserVersion(*row)
+
+
+async def get_tasks_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    key = tasks_version_key(user_id)
+    cached = await shared_cache.get_json(key)
+    if cached is not None:
+        return cached
+    version = (await db.execute(tasks_version_query(user_id))).scalar_one_or_none()
+    if version is not None:
+        await shared_cache.set_json(key, version)
+    return version
+
+
+async def bump_tasks_version(db: AsyncSession, user_id: int):
+    # Вызывается в транзакции изменения, до commit
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(tasks_version=User.tasks_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def invalidate_tasks_version(user_id: int, telegram_id: Optional[int] = None):
+    # После commit: кешированная версия задач устарела у всех воркеров
+    await shared_cache.invalidate(user_keys(user_id, telegram_id=telegram_id))
+
+
+async def list_tasks(
+    db: AsyncSession,
+    user_id: int,
+    is_completed: Optional[bool] = None,
+    order_by: str = "id",
+    after_id: Optional[int] = None,
+    after_deadline: Optional[datetime] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+) -> List[Task]:
+    result = await db.execute(
+        tasks_query(user_id, is_completed, order_by, after_id, after_deadline, limit)
+    )
+    return list(result.scalars().all())
+
+
+async def list_task_rows(
+    db: AsyncSession,
+    user_id: int,
+    is_completed: Optional[bool] = None,
+    order_by: str = "id",
+    after_id: Optional[int] = None,
+    after_deadline: Optional[datetime] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+) -> List[Row]:
+    result = await db.execute(
+        tasks_query(user_id, is_completed, order_by, after_id, after_deadline, limit, TASK_READ_COLUMNS)
+    )
+    return list(result.all())
+
+
+def search_query(user_id: int, match: str, limit: int = 20, offset: int = 0):
+    fts = literal_column(TASK_FTS_TABLE)
+    rank = func.bm25(fts, *TASK_FTS_WEIGHTS)
+    return (
+        select(*TASK_READ_COLUMNS)
+        .select_from(task_fts)
+        .join(Task, Task.id == task_fts.c.rowid)
+        .where(fts.op("MATCH")(match), Task.user_id == user_id)
+        .order_by(rank, Task.id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+async def search_tasks(
+    db: AsyncSession, user_id: int, text: str, limit: int = 20, offset: int = 0
+) -> List[Row]:
+    # Поиск идёт по индексу task_fts, таблица task читается только для найденных строк
+    match = fts_match(user_id, text)
+    if match is None:
+        return []
+    result = await db.execute(search_query(user_id, match, limit, offset))
+    return list(result.all())
+
+
+# Поля задачи, которые можно менять по одному (PUT /task/update/)
+EDITABLE_FIELDS = ("title", "description", "deadline", "is_completed")
+
+
+def parse_field_value(field: str, value: str):
+    if field == "is_completed":
+        return True if str(value).lower() in ['true', '1', 'yes'] else False
+    if field == "deadline":
+        try:
+            # Превращаем строку "2026-01-17" в объект Python datetime
+            return datetime.strptime(value, '%Y-%m-%d')
+        except (ValueError, TypeError):
+            # Если пришла пустая строка или плохой формат — записываем None
+            return None
+    return value
+
+
+async def create_task(
+    db: AsyncSession,
+    user: Union[User, UserIdentity],
+    title: str,
+    description: Optional[str] = None,
+    deadline: Optional[datetime] = None,
+) -> Task:
+    new_task = Task(
+        title=title,
+        description=description,
+        deadline=deadline,
+        is_completed=False,
+        user_id=user.id
+    )
+    db.add(new_task)
+    await bump_tasks_version(db, user.id)
+
+    # Уведомление пишется в outbox в той же транзакции, отправит его диспетчер
+    if user.telegram_id:
+        deadline_str = new_task.deadline.strftime('%d.%m.%Y') if new_task.deadline else "не указан"
+        text = f"✅ **Новая задача создана!**\n\n📌 {new_task.title}\n📝 {new_task.description}\n📅 Срок: {deadline_str}"
+        enqueue_notification(db, user.telegram_id, text, parse_mode="Markdown")
+
+    await db.commit()
+    await db.refresh(new_task)
+    await invalidate_tasks_version(user.id, user.telegram_id)
+    outbox_dispatcher.wakeup()
+    reminder_scheduler.schedule(new_task.id, new_task.deadline)
+    return new_task
+
+
+async def delete_task(db: AsyncSession, task_id: int, user_id: Optional[int] = None) -> Optional[Task]:
+    query = await db.execute(task_query(task_id, user_id))
+    task_obj = query.scalars().first()
+    if not task_obj:
+        return None
+
+    user_query = await db.execute(select(User).where(User.id == task_obj.user_id))
+    user = user_query.scalars().first()
+
+    await db.execute(delete(Task).where(Task.id == task_id))
+    await bump_tasks_version(db, task_obj.user_id)
+    if user and user.telegram_id:
+        enqueue_notification(db, user.telegram_id, f"🗑 Задача удалена: {task_obj.title}")
+    await db.commit()
+    await invalidate_tasks_version(task_obj.user_id, user.telegram_id if user else None)
+    outbox_dispatcher.wakeup()
+    return task_obj
+
+
+class TaskVersionConflict(Exception):
+    """Задачу успели изменить: ожидаемая версия не совпала с текущей."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Task version is {current_version}")
+        self.current_version = current_version
+
+
+async def patch_task(
+    db: AsyncSession,
+    task_id: int,
+    values: dict,
+    expected_version: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> Optional[Task]:
+    """Меняет несколько полей задачи одним UPDATE ... RETURNING.
+
+    С expected_version запись обновляется, только если её никто не изменил
+    раньше, иначе TaskVersionConflict. Chat id для уведомления приходит тем же
+    запросом через подзапрос в RETURNING, без отдельного SELECT. С user_id
+    чужая задача считается ненайденной.
+    """
+    reschedule = "deadline" in values or values.get("is_completed") is False
+    row = (await db.execute(patch_task_query(task_id, values, expected_version, user_id))).first()
+
+    if row is None:
+        if expected_version is None:
+            return None
+        # Промах по версии: отличаем удалённую задачу от изменённой
+        version_query = select(Task.version).where(Task.id == task_id)
+        if user_id is not None:
+            version_query = version_query.where(Task.user_id == user_id)
+        current_version = await db.scalar(version_query)
+        if current_version is None:
+            return None
+        raise TaskVersionConflict(current_version)
+
+    task_obj, chat_id = row
+    await bump_tasks_version(db, task_obj.user_id)
+    if chat_id:
+        changes = "\n".join(f"Поле *{field}* изменено на: `{value}`" for field, value in values.items())
+        enqueue_notification(db, chat_id, f"🔄 Задача обновлена!\n{changes}", parse_mode="Markdown")
+    await db.commit()
+    await invalidate_tasks_version(task_obj.user_id, chat_id)
+    outbox_dispatcher.wakeup()
+    if reschedule:
+        reminder_scheduler.schedule(task_obj.id, task_obj.deadline)
+    return task_obj
+
+
+async def update_task_field(db: AsyncSession, task_id: int, field: str, value) -> Optional[Task]:
+    if field not in EDITABLE_FIELDS:
+        raise ValueError(f"Field {field} cannot be changed")
+    return await patch_task(db, task_id, {field: value})
+
+
+async def bulk_apply(
+    db: AsyncSession,
+    user: Union[User, UserIdentity],
+    creates: Iterable[dict] = (),
+    updates: Iterable[dict] = (),
+    complete_ids: Iterable[int] = (),
+    delete_ids: Iterable[int] = (),
+) -> List[dict]:
+    """Применяет пакет изменений одной транзакцией.
+
+    Каждая группа уходит одним executemany или одним UPDATE/DELETE ... IN,
+    чужие и несуществующие задачи попадают в результат как not_found,
+    изменения без полей — как skipped.
+    Пользователь получает одно сводное уведомление на весь пакет.
+    """
+    creates, updates = list(creates), list(updates)
+    complete_ids, delete_ids = list(dict.fromkeys(complete_ids)), list(dict.fromkeys(delete_ids))
+    results = []
+
+    schedule = []
+
+    referenced = {item["id"] for item in updates} | set(complete_ids) | set(delete_ids)
+    owned = set()
+    if referenced:
+        owned_query = await db.execute(owned_task_ids_query(user.id, referenced))
+        owned = set(owned_query.scalars().all())
+
+    if creates:
+        rows = [
+            {
+                "title": item["title"],
+                "description": item.get("description"),
+                "deadline": item.get("deadline"),
+                "is_completed": False,
+                "user_id": user.id,
+            }
+            for item in creates
+        ]
+        # Один INSERT ... VALUES на пачку; rowid внутри него растут в порядке строк,
+        # поэтому отсортированные id совпадают с порядком create
+        # (sort_by_parameter_order на SQLite разворачивает вставку в построчную)
+        created = await db.execute(insert(Task).returning(Task.id), rows)
+        created_ids = sorted(created.scalars())
+        results += [{"op": "create", "id": task_id, "status": "created"} for task_id in created_ids]
+        schedule += [(task_id, row["deadline"]) for task_id, row in zip(created_ids, rows)]
+
+    update_rows = [
+        item | {"reminded_at": None, "overdue_notified_at": None} if "deadline" in item else item
+        for item in updates
+        if item["id"] in owned and len(item) > 1
+    ]
+    schedule += [(item["id"], item["deadline"]) for item in update_rows if "deadline" in item]
+    if update_rows:
+        # ORM bulk UPDATE по первичному ключу: executemany, сгруппированный по набору полей
+        await db.execute(update(Task), update_rows)
+        await db.execute(
+            update(Task)
+            .where(Task.id.in_([item["id"] for item in update_rows]))
+            .values(version=Task.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    # Элемент только с id ничего не меняет — так и сообщаем, а не «updated»
+    results += [
+        {
+            "op": "update",
+            "id": item["id"],
+            "status": "not_found" if item["id"] not in owned else "updated" if len(item) > 1 else "skipped",
+        }
+        for item in updates
+    ]
+
+    to_complete = [task_id for task_id in complete_ids if task_id in owned]
+    if to_complete:
+        await db.execute(
+            update(Task)
+            .where(Task.id.in_(to_complete))
+            .values(is_completed=True, version=Task.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    results += [
+        {"op": "complete", "id": task_id, "status": "completed" if task_id in owned else "not_found"}
+        for task_id in complete_ids
+    ]
+
+    to_delete = [task_id for task_id in delete_ids if task_id in owned]
+    if to_delete:
+        await db.execute(
+            delete(Task)
+            .where(Task.id.in_(to_delete))
+            .execution_options(synchronize_session=False)
+        )
+    results += [
+        {"op": "delete", "id": task_id, "status": "deleted" if task_id in owned else "not_found"}
+        for task_id in delete_ids
+    ]
+
+    counts = {}
+    for item in results:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    changed = sum(count for status, count in counts.items() if status not in ("not_found", "skipped"))
+    if changed:
+        await bump_tasks_version(db, user.id)
+    if changed and user.telegram_id:
+        msg = (
+            "📦 Пакетное изменение задач\n\n"
+            f"➕ Создано: {counts.get('created', 0)}\n"
+            f"✏️ Обновлено: {counts.get('updated', 0)}\n"
+            f"✅ Завершено: {counts.get('completed', 0)}\n"
+            f"🗑 Удалено: {counts.get('deleted', 0)}"
+        )
+        enqueue_notification(db, user.telegram_id, msg)
+
+    await db.commit()
+    if changed:
+        await invalidate_tasks_version(user.id, user.telegram_id)
+        outbox_dispatcher.wakeup()
+    for task_id, deadline in schedule:
+        reminder_scheduler.schedule(task_id, deadline)
+    return results
@@ -0,0 +1,86 @@
+"""Запросы к пользователям, общие для HTTP-роутов и бота."""
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import Row, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.models import User
+from backend.services.shared_cache import shared_cache, user_by_name_key, user_keys
+
+# Поля UserReadSchema без hashed_password
+USER_READ_COLUMNS = (User.id, User.username, User.telegram_id)
+
+
+class UserIdentity(NamedTuple):
+    id: int
+    username: str
+    telegram_id: Optional[int]
+
+
+def user_by_username_query(username: str, columns: Optional[tuple] = None):
+    return (select(*columns) if columns else select(User)).where(User.username == username)
+
+
+async def list_users(db: AsyncSession) -> List[User]:
+    result = await db.execute(select(User))
+    return list(result.scalars().all())
+
+
+async def list_user_rows(db: AsyncSession) -> List[Row]:
+    result = await db.execute(select(*USER_READ_COLUMNS))
+    return list(result.all())
+
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    result = await db.execute(user_by_username_query(username))
+    return result.scalars().first()
+
+
+async def get_user_identity_by_username(db: AsyncSession, username: str) -> Optional[UserIdentity]:
+    """Поля USER_READ_COLUMNS через общий кеш; промахи не кешируются."""
+    key = user_by_name_key(username)
+    cached = await shared_cache.get_json(key)
+    if cached is not None:
+        return UserIdentity(*cached)
+    row = (await db.execute(user_by_username_query(username, USER_READ_COLUMNS))).first()
+    if row is None:
+        return None
+    await shared_cache.set_json(key, list(row))
+    return UserIdentity(*row)
+
+
+async def _cached_user_keys(db: AsyncSession, user_id: int) -> List[str]:
+    # Ключи кеша строятся из username и telegram_id, которые сейчас поменяются
+    row = (await db.execute(select(User.username, User.telegram_id).where(User.id == user_id))).first()
+    return user_keys(user_id, *row) if row else user_keys(user_id)
+
+
+async def create_user(
+    db: AsyncSession,
+    username: str,
+    hashed_password: str,
+    telegram_id: Optional[int] = None,
+) -> User:
+    new_user = User(
+        telegram_id=telegram_id,
+        username=username,
+        hashed_password=hashed_password,
+    )
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    return new_user
+
+
+async def update_user(db: AsyncSession, user_id: int, values: dict):
+    keys = await _cached_user_keys(db, user_id)
+    await db.execute(update(User).where(User.id == user_id).values(**values))
+    await db.commit()
+    await shared_cache.invalidate(keys + user_keys(user_id, values.get("username"), values.get("telegram_id")))
+
+
+async def delete_user(db: AsyncSession, user_id: int):
+    keys = await _cached_user_keys(db, user_id)
+    await db.execute(delete(User).where(User.id == user_id))
+    await db.commit()
+    await shared_cache.invalidate(keys)
@@ -0,0 +1,62 @@
+"""Прогрев воркера до приёма трафика.
+
+uvicorn начинает принимать соединения только после startup в lifespan,
+поэтому всё, за что иначе заплатили бы первые запросы холодного воркера,
+делается здесь: соединения пулов открыты и уже прочитали схему SQLite,
+шаблоны скомпилированы, манифест статики загружен, потоки bcrypt подняты.
+"""
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.database.database import engine, read_engine
+from backend.routes.web import precompile_templates
+from backend.services.assets import load_manifest
+from backend.services.hashing import password_hasher
+from backend.services.metrics import app_warmup_seconds
+
+logger = logging.getLogger(__name__)
+
+
+async def _open_connection(stack: AsyncExitStack, db_engine: AsyncEngine):
+    conn = await stack.enter_async_context(db_engine.connect())
+    # Схема читается каждым соединением SQLite при первом запросе к таблицам
+    await conn.exec_driver_sql("SELECT count(*) FROM sqlite_master")
+
+
+async def warm_pool(db_engine: AsyncEngine) -> int:
+    """Открывает сразу pool_size соединений: после закрытия они остаются в пуле."""
+    size = max(1, db_engine.pool.size()) if hasattr(db_engine.pool, "size") else 1
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*(_open_connection(stack, db_engine) for _ in range(size)))
+    return size
+
+
+async def _warm_db() -> int:
+    opened = await warm_pool(engine)
+    if read_engine is not engine:
+        opened += await warm_pool(read_engine)
+    return opened
+
+
+async def warm_up() -> dict:
+    """Прогревает воркер и возвращает время каждого шага в секундах."""
+    steps = (
+        ("db", _warm_db),
+        ("templates", precompile_templates),
+        ("assets", load_manifest),
+        ("hasher", password_hasher.warm_up),
+    )
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        result = step()
+        if asyncio.iscoroutine(result):
+            await result
+        timings[name] = time.perf_counter() - start
+        app_warmup_seconds.set(timings[name], step=name)
+    logger.info("Warm-up done: " + ", ".join(f"{name} {value * 1000:.1f} ms" for name, value in timings.items()))
+    return timings
@@ -0,0 +1,182 @@
+"""Нагрузка на FastAPI-приложение в процессе, без сети.
+
+Виртуальные пользователи параллельно гоняют смешанный сценарий (списки,
+счётчики, поиск, веб-страница, правки и добавление задач) через ASGI-вызов
+приложения; на выходе — пропускная способность и p50/p95/p99 по каждому
+эндпоинту. Пишущие запросы меняют базу, поэтому прогон идёт на копии
+засеянной базы. Фоновые задачи lifespan (outbox, напоминания) не
+запускаются: меряется только обработка запросов.
+
+    python -m benchmarks.api --tasks 100k --concurrency 32 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import orjson
+
+from benchmarks.common import Recorder, configure_env, parse_size, users_for
+from benchmarks.seed import seed, telegram_id
+
+SEARCH_WORDS = ("молоко", "отчёт", "купить", "счёт", "срочно", "докум")
+
+
+class AsgiClient:
+    """Минимальный ASGI-клиент: один запрос — один вызов приложения."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, query: str = "", body=None) -> tuple:
+        payload = orjson.dumps(body) if body is not None else b""
+        headers = [(b"host", b"bench")]
+        if body is not None:
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "root_path": "", "query_string": query.encode(), "headers": headers,
+            "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        received = False
+        status = 0
+        chunks = []
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            # Клиент не отключается: потоковые ответы дочитываются до конца
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+
+class Scenario:
+    """Взвешенный набор запросов; id задач соответствуют раскладке из seed."""
+
+    def __init__(self, tasks: int):
+        self.tasks = tasks
+        self.users = users_for(tasks)
+        self.steps = (
+            ("GET /task/show/{tg}", 30, self.show),
+            ("GET /task/showactive/{id}", 15, self.show_active),
+            ("GET /task/stats/{tg}", 15, self.stats),
+            ("GET /task/search/{tg}", 10, self.search),
+            ("GET /tasks/{username}", 10, self.web_page),
+            ("PATCH /task/{id}", 12, self.patch),
+            ("POST /task/add/", 5, self.add),
+            ("POST /task/bulk", 3, self.bulk),
+        )
+        self.names = [name for name, _, _ in self.steps]
+        self.weights = [weight for _, weight, _ in self.steps]
+
+    def pick(self, rng: random.Random):
+        index = rng.choices(range(len(self.steps)), self.weights)[0]
+        user_id = rng.randint(1, self.users)
+        return self.names[index], self.steps[index][2](rng, user_id)
+
+    def task_of(self, rng: random.Random, user_id: int) -> int:
+        # Задача i (с 1) принадлежит пользователю (i - 1) % users + 1
+        return user_id + self.users * rng.randrange(max(1, self.tasks // self.users))
+
+    def show(self, rng, user_id):
+        return "GET", f"/task/show/{telegram_id(user_id)}", "limit=50", None
+
+    def show_active(self, rng, user_id):
+        return "GET", f"/task/showactive/{user_id}", "limit=50&order_by=deadline", None
+
+    def stats(self, rng, user_id):
+        return "GET", f"/task/stats/{telegram_id(user_id)}", "", None
+
+    def search(self, rng, user_id):
+        return "GET", f"/task/search/{telegram_id(user_id)}", f"q={rng.choice(SEARCH_WORDS)}", None
+
+    def web_page(self, rng, user_id):
+        return "GET", f"/tasks/user{user_id}", "", None
+
+    def patch(self, rng, user_id):
+        return "PATCH", f"/task/{self.task_of(rng, user_id)}", "", {"is_completed": rng.random() < 0.5}
+
+    def add(self, rng, user_id):
+        return "POST", "/task/add/", "", {"title": f"Нагрузка {rng.randrange(10**6)}", "username": f"user{user_id}"}
+
+    def bulk(self, rng, user_id):
+        return "POST", "/task/bulk", "", {
+            "username": f"user{user_id}",
+            "create": [{"title": f"Пакет {n}"} for n in range(10)],
+            "complete": [self.task_of(rng, user_id) for _ in range(5)],
+        }
+
+
+async def run(tasks: int, concurrency: int, requests: int, warmup: int, seed_value: int) -> dict:
+    from backend.database.database import dispose_engines
+    from backend.main import app
+    from backend.routes.web import precompile_templates
+
+    precompile_templates()
+    client = AsgiClient(app)
+    scenario = Scenario(tasks)
+    recorder = Recorder()
+    remaining = warmup + requests
+
+    async def virtual_user(number: int):
+        nonlocal remaining
+        rng = random.Random(seed_value * 1000 + number)
+        while remaining > 0:
+            remaining -= 1
+            recording = remaining < requests
+            name, (method, path, query, body) = scenario.pick(rng)
+            start = time.perf_counter()
+            status, _ = await client.request(method, path, query, body)
+            if recording:
+                recorder.record(name, time.perf_counter() - start, ok=status < 400)
+            elif remaining == requests:
+                recorder.started = time.perf_counter()
+
+    await asyncio.gather(*(virtual_user(n) for n in range(concurrency)))
+    recorder.stop()
+    await dispose_engines()
+    return recorder.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=parse_size, default=parse_size("1k"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    source = seed(args.tasks, args.seed)
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        db_copy = Path(tmp) / source.name
+        shutil.copyfile(source, db_copy)
+        configure_env(db_copy)
+        result = asyncio.run(run(args.tasks, args.concurrency, args.requests, args.warmup, args.seed))
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        from benchmarks.report import print_table
+        print_table(f"API, {args.tasks} задач, {args.concurrency} VU", result)
+
+
+if __name__ == "__main__":
+    main()
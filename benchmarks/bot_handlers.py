@@ -0,0 +1,110 @@
+"""Бенчмарк хендлеров бота без Telegram.
+
+Апдейты (/start, кнопки списков, /search) подаются прямо в Dispatcher
+через feed_update, а Bot работает на FakeSession из bot.testing: вызовы
+API не уходят в сеть, а считаются и возвращают правдоподобный ответ.
+Транспорт бота — local, поэтому хендлеры читают засеянную базу в этом же
+процессе.
+FSM по умолчанию в памяти, кеш страниц выключен; --redis оставляет
+RedisStorage и кеш страниц бота.
+
+    python -m benchmarks.bot_handlers --tasks 100k --updates 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from benchmarks.common import Recorder, configure_env, parse_size, users_for
+from benchmarks.seed import seed, telegram_id
+from bot.testing import FakeSession, callback_update, message_update
+
+SEARCH_WORDS = ("молоко", "отчёт", "купить", "срочно")
+
+
+UPDATES = (
+    ("/start", 20, lambda n, chat, rng: message_update(chat, "/start", n)),
+    ("button_show_all", 30, lambda n, chat, rng: callback_update(chat, "button_show_all", n)),
+    ("button_show_active", 20, lambda n, chat, rng: callback_update(chat, "button_show_active", n)),
+    ("button_show_closed", 10, lambda n, chat, rng: callback_update(chat, "button_show_closed", n)),
+    ("/search", 20, lambda n, chat, rng: message_update(chat, f"/search {rng.choice(SEARCH_WORDS)}", n)),
+)
+
+
+async def run(tasks: int, concurrency: int, updates: int, warmup: int, seed_value: int, use_redis: bool) -> dict:
+    from bot import bot as bot_module
+
+    dp = bot_module.dp
+    if not use_redis:
+        dp.fsm.storage = MemoryStorage()
+        # Без Redis листание работает без кеша страниц
+        bot_module.task_pager.redis = None
+    session = FakeSession()
+    bot = Bot(token=os.environ["TOKEN"], session=session, default=DefaultBotProperties(parse_mode="HTML"))
+    await bot_module.transport.start()
+
+    names = [name for name, _, _ in UPDATES]
+    weights = [weight for _, weight, _ in UPDATES]
+    users = users_for(tasks)
+    recorder = Recorder()
+    remaining = warmup + updates
+    update_ids = iter(range(1, 10**9))
+
+    async def virtual_chat(number: int):
+        nonlocal remaining
+        rng = random.Random(seed_value * 1000 + number)
+        while remaining > 0:
+            remaining -= 1
+            recording = remaining < updates
+            index = rng.choices(range(len(UPDATES)), weights)[0]
+            update = UPDATES[index][2](next(update_ids), telegram_id(rng.randint(1, users)), rng)
+            start = time.perf_counter()
+            ok = True
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                ok = False
+            if recording:
+                recorder.record(names[index], time.perf_counter() - start, ok=ok)
+            elif remaining == updates:
+                recorder.started = time.perf_counter()
+
+    await asyncio.gather(*(virtual_chat(n) for n in range(concurrency)))
+    recorder.stop()
+    await bot_module.transport.close()
+    result = recorder.summary()
+    # Вызовы Telegram API на один апдейт — чтобы заметить лишние запросы хендлеров
+    result["total"]["api_calls_per_update"] = sum(session.calls.values()) / (warmup + updates)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=parse_size, default=parse_size("1k"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--redis", action="store_true", help="FSM в Redis, как в боевом боте")
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    configure_env(seed(args.tasks, args.seed))
+    os.environ["BOT_TRANSPORT"] = "local"
+    result = asyncio.run(run(args.tasks, args.concurrency, args.updates, args.warmup, args.seed, args.redis))
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        from benchmarks.report import print_table
+        print_table(f"Бот, {args.tasks} задач, {args.concurrency} чатов", result)
+
+
+if __name__ == "__main__":
+    main()
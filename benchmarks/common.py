@@ -0,0 +1,85 @@
+"""Общие части бенчмарков: окружение, размеры, перцентили и сводка."""
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+
+DATA_DIR = Path(os.getenv("BENCH_DATA_DIR", Path(__file__).resolve().parent / ".data"))
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1:] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def size_label(tasks: int) -> str:
+    for suffix, factor in sorted(SIZE_SUFFIXES.items(), key=lambda item: -item[1]):
+        if tasks >= factor and tasks % factor == 0:
+            return f"{tasks // factor}{suffix}"
+    return str(tasks)
+
+
+def users_for(tasks: int) -> int:
+    # ~1000 задач на пользователя, но не меньше 10 пользователей
+    return max(10, tasks // 1000)
+
+
+def configure_env(db_path: Path):
+    """Настройки backend читаются при импорте — вызывать до импорта backend и bot."""
+    os.environ["DATABASE_PATH"] = str(db_path)
+    os.environ.setdefault("DB_ECHO", "0")
+    os.environ.setdefault("TOKEN", "1:bench")
+    # Фоновые задачи (outbox, напоминания) в бенчмарке не запускаются
+    os.environ.setdefault("TASK_STATS_RECHECK_SECONDS", "0")
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-q * len(sorted_values) // 1)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Задержки и ошибки по имени операции."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, name: str, seconds: float, ok: bool = True):
+        self.samples[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        wall = (self.finished or time.perf_counter()) - self.started
+        result = {}
+        everything = []
+        for name in sorted(self.samples):
+            values = sorted(self.samples[name])
+            everything.extend(values)
+            result[name] = _describe(values, self.errors[name], wall)
+        result["total"] = _describe(sorted(everything), sum(self.errors.values()), wall)
+        return result
+
+
+def _describe(values: list, errors: int, wall: float) -> dict:
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": len(values) / wall if wall else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+    }
@@ -0,0 +1,42 @@
+"""Вывод результатов и сравнение с сохранённым baseline.
+
+Регрессией считается рост p95 больше чем на tolerance (и больше чем на
+min_delta_ms — чтобы не ловить шум на долях миллисекунды) или падение
+пропускной способности больше чем на tolerance. Операции, у которых меньше
+min_count замеров, не сравниваются: p95 по ним — шум.
+"""
+from typing import List
+
+def print_table(title: str, result: dict):
+    width = max(map(len, result))
+    print(title)
+    print(f"{'':<{width}}  {'count':>7} {'errors':>6} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in result.items():
+        print(
+            f"{name:<{width}}  {row['count']:>7} {row['errors']:>6} {row['rps']:>9.1f}"
+            f" {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}"
+        )
+    print()
+
+
+def compare(
+    current: dict, baseline: dict, tolerance: float = 0.2, min_delta_ms: float = 1.0, min_count: int = 50
+) -> List[str]:
+    """Список регрессий; сравниваются только размеры и операции, что есть в обоих прогонах."""
+    regressions = []
+    for size, suites in current.items():
+        for suite, operations in suites.items():
+            base_operations = baseline.get(size, {}).get(suite, {})
+            for name, row in operations.items():
+                base = base_operations.get(name)
+                if base is None or min(row["count"], base["count"]) < min_count:
+                    continue
+                where = f"{size} {suite} {name}"
+                p95, base_p95 = row["p95_ms"], base["p95_ms"]
+                if p95 > base_p95 * (1 + tolerance) and p95 - base_p95 > min_delta_ms:
+                    regressions.append(f"{where}: p95 {base_p95:.2f} -> {p95:.2f} ms")
+                if row["rps"] < base["rps"] * (1 - tolerance):
+                    regressions.append(f"{where}: rps {base['rps']:.1f} -> {row['rps']:.1f}")
+                if row["errors"] > base["errors"]:
+                    regressions.append(f"{where}: errors {base['errors']} -> {row['errors']}")
+    return regressions
@@ -0,0 +1,87 @@
+"""Полный прогон бенчмарков с проверкой регрессий.
+
+Для каждого размера базы засевает данные (или берёт из кеша) и запускает
+benchmarks.api и benchmarks.bot_handlers отдельными процессами: настройки
+backend читаются при импорте, а так каждый прогон начинается с чистого
+состояния. Цифры зависят от машины, поэтому baseline не хранится в
+репозитории: его записывают прогоном на той же машине до изменений, и
+тогда результат сравнивается с ним; при регрессии код выхода 1.
+
+    python -m benchmarks.run --sizes 1k,100k --save-baseline /tmp/baseline.json
+    python -m benchmarks.run --sizes 1k,100k --baseline /tmp/baseline.json
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.common import parse_size, size_label
+from benchmarks.report import compare, print_table
+from benchmarks.seed import seed
+
+
+def _run_suite(module: str, tasks: int, args: list) -> dict:
+    command = [sys.executable, "-m", module, "--tasks", str(tasks), "--json", *args]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, check=True)
+    return json.loads(completed.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,100k", help="размеры базы через запятую: 1k,100k,1m")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--baseline", type=Path, help="сравнить с сохранённым baseline")
+    parser.add_argument("--save-baseline", type=Path, help="записать результат как baseline")
+    parser.add_argument("--output", type=Path, help="куда сохранить результат в JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    if args.baseline and not args.baseline.exists():
+        parser.error(f"baseline {args.baseline} not found")
+
+    common = ["--seed", str(args.seed), "--concurrency", str(args.concurrency)]
+    results = {}
+    for tasks in map(parse_size, args.sizes.split(",")):
+        seed(tasks, args.seed)
+        label = size_label(tasks)
+        results[label] = {
+            "api": _run_suite("benchmarks.api", tasks, common + ["--requests", str(args.requests)]),
+            "bot": _run_suite("benchmarks.bot_handlers", tasks, common + ["--updates", str(args.updates)]),
+        }
+        print_table(f"API, {label} задач, {args.concurrency} VU", results[label]["api"])
+        print_table(f"Бот, {label} задач, {args.concurrency} чатов", results[label]["bot"])
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"Baseline сохранён: {args.save_baseline}")
+    if not args.baseline:
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print("Регрессии относительно baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("Регрессий относительно baseline нет")
+
+
+if __name__ == "__main__":
+    main()
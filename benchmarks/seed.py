@@ -0,0 +1,132 @@
+"""Синтетическая база для бенчмарков.
+
+Схема создаётся из моделей (вместе с FTS и триггерами счётчиков), данные —
+детерминированно из seed, поэтому один и тот же размер даёт одну и ту же
+базу. Готовые базы кешируются в benchmarks/.data и пересоздаются только
+с --force.
+
+    python -m benchmarks.seed --tasks 100k
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import DATA_DIR, parse_size, size_label, users_for
+
+NOW = datetime(2026, 1, 1)
+BATCH = 10_000
+# user_version помечает полностью засеянную базу
+SEEDED_MARK = 20260101
+
+VERBS = ("Купить", "Позвонить", "Написать", "Проверить", "Оплатить", "Забрать", "Починить", "Отправить")
+NOUNS = ("молоко", "отчёт", "письмо", "счёт", "посылку", "машину", "презентацию", "документы", "билеты")
+DETAILS = ("до обеда", "в магазине у дома", "по работе", "срочно", "после встречи", "на выходных")
+
+
+def db_path(tasks: int, seed: int) -> Path:
+    return DATA_DIR / f"bench_{size_label(tasks)}_{seed}.db"
+
+
+def telegram_id(user_id: int) -> int:
+    return 10_000_000 + user_id
+
+
+def user_row(user_id: int) -> tuple:
+    # Пароль непригоден для входа: бенчмарк не ходит через bcrypt
+    return (user_id, telegram_id(user_id), f"user{user_id}", "!")
+
+
+def _ts(value):
+    # Тот же формат, что пишет SQLAlchemy: сравнения строк в SQLite должны совпадать
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f") if value else None
+
+
+def _create_schema(path: Path):
+    from sqlalchemy import create_engine
+
+    from backend.database.database import Base
+    import backend.models.models  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+def _tasks(rng: random.Random, tasks: int, users: int):
+    for i in range(tasks):
+        is_completed = rng.random() < 0.3
+        deadline = None
+        overdue_notified_at = None
+        if rng.random() < 0.7:
+            deadline = NOW + timedelta(hours=rng.randint(-30 * 24, 60 * 24))
+            if deadline < NOW and not is_completed:
+                overdue_notified_at = deadline
+        description = None
+        if rng.random() < 0.6:
+            description = f"{rng.choice(DETAILS)}, {rng.choice(NOUNS)}"
+        yield (
+            f"{rng.choice(VERBS)} {rng.choice(NOUNS)} #{i + 1}",
+            description,
+            _ts(NOW - timedelta(minutes=tasks - i)),
+            _ts(deadline),
+            is_completed,
+            _ts(NOW),
+            _ts(overdue_notified_at),
+            _ts(overdue_notified_at),
+            i % users + 1,
+        )
+
+
+def seed(tasks: int, seed: int = 1, force: bool = False) -> Path:
+    path = db_path(tasks, seed)
+    if path.exists() and not force:
+        with sqlite3.connect(path) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] == SEEDED_MARK:
+                return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    _create_schema(path)
+
+    rng = random.Random(seed)
+    users = users_for(tasks)
+    start = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany(
+        "INSERT INTO user (id, telegram_id, username, hashed_password) VALUES (?, ?, ?, ?)",
+        (user_row(user_id) for user_id in range(1, users + 1)),
+    )
+    rows = _tasks(rng, tasks, users)
+    while batch := [row for _, row in zip(range(BATCH), rows)]:
+        conn.executemany(
+            "INSERT INTO task (title, description, created_at, deadline, is_completed, updated_at,"
+            " reminded_at, overdue_notified_at, user_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+    conn.execute("ANALYZE")
+    conn.execute(f"PRAGMA user_version={SEEDED_MARK}")
+    conn.commit()
+    conn.close()
+    print(
+        f"Засеяно {tasks} задач / {users} пользователей за {time.perf_counter() - start:.1f} с: {path}",
+        file=sys.stderr,
+    )
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=parse_size, default=parse_size("1k"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    seed(args.tasks, args.seed, args.force)
+
+
+if __name__ == "__main__":
+    main()
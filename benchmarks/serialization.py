@@ -0,0 +1,117 @@
+"""Микробенчмарк сериализации списка задач.
+
+Сравнивает путь «до» (ORM-объекты -> jsonable_encoder -> json), путь с
+response_model (валидация в TaskReadSchema -> jsonable_encoder -> json) и
+путь «после» (кортежи колонок -> orjson). Отдельно меряется выборка: ORM
+против кортежей. Время — медиана на 1000 задач.
+
+    python -m benchmarks.serialization --tasks 1000 --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from backend.database.database import Base
+from backend.models.models import Task, User
+from backend.schemas.schemas import TaskReadSchema
+from backend.services import tasks as task_service
+
+
+def _median_ms(func, repeat: int, scale: float) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000 * scale
+
+
+async def _median_ms_async(func, repeat: int, scale: float) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000 * scale
+
+
+async def run(tasks_count: int, repeat: int):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    now = datetime(2026, 1, 1)
+    async with Session() as db:
+        db.add(User(id=1, username="bench", hashed_password="x"))
+        db.add_all(
+            Task(
+                title=f"Задача {i}",
+                description="Описание задачи для бенчмарка",
+                deadline=now + timedelta(days=i % 30) if i % 3 else None,
+                user_id=1,
+            )
+            for i in range(tasks_count)
+        )
+        await db.commit()
+
+    scale = 1000 / tasks_count
+    adapter = TypeAdapter(List[TaskReadSchema])
+    results = {}
+
+    async with Session() as db:
+        async def fetch_orm():
+            db.expunge_all()
+            return await task_service.list_tasks(db, 1, limit=tasks_count)
+
+        async def fetch_rows():
+            return await task_service.list_task_rows(db, 1, limit=tasks_count)
+
+        results["fetch: ORM objects"] = await _median_ms_async(fetch_orm, repeat, scale)
+        results["fetch: column tuples"] = await _median_ms_async(fetch_rows, repeat, scale)
+        orm_tasks = await fetch_orm()
+        rows = await fetch_rows()
+
+    results["serialize: ORM -> jsonable_encoder -> json (before)"] = _median_ms(
+        lambda: json.dumps(jsonable_encoder(orm_tasks)).encode(), repeat, scale
+    )
+    results["serialize: response_model -> jsonable_encoder -> json"] = _median_ms(
+        lambda: json.dumps(jsonable_encoder(adapter.validate_python(orm_tasks, from_attributes=True))).encode(),
+        repeat, scale,
+    )
+    results["serialize: tuples -> orjson (after)"] = _median_ms(
+        lambda: orjson.dumps([row._asdict() for row in rows]), repeat, scale
+    )
+    await engine.dispose()
+
+    # Новый путь отдаёт ровно то же, что response_model
+    assert orjson.loads(orjson.dumps([row._asdict() for row in rows])) == json.loads(
+        adapter.dump_json(adapter.validate_python(orm_tasks, from_attributes=True))
+    )
+
+    width = max(map(len, results))
+    print(f"{tasks_count} задач, {repeat} повторов; медиана, мс на 1000 задач")
+    for name, value in results.items():
+        print(f"{name:<{width}}  {value:8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.tasks, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
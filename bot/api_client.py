@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Пока бэкенд недоступен, запросы сразу отклоняются, а не ждут таймаутов."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 15.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        # В half_open пропускаем пробный запрос; его исход закроет или снова откроет цепь
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.state == "half_open":
+                logger.warning("Backend circuit opened")
+            self.opened_at = time.monotonic()
+
+
+class ApiClient:
+    # Только чтение: повтор PUT /task/update/ снова поднимает версию и шлёт уведомление,
+    # повтор DELETE после потерянного ответа получает 404
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+    # Ответы прокси и перегруженного бэкенда; прочие 5xx — ошибки конкретного запроса
+    UNAVAILABLE_STATUSES = {502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str,
+        limit: int = 100,
+        limit_per_host: int = 50,
+        keepalive_timeout: float = 30.0,
+        timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(total=10, connect=3),
+        retries: int = 2,
+        backoff: float = 0.2,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        payload: Optional[dict] = None,
+        params: Optional[dict] = None,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+    ):
+        """Возвращает (json, status); при недоступном бэкенде — (None, 500/503)."""
+        method = method.upper()
+        if not self.breaker.allow():
+            return None, 503
+        if self.session is None or self.session.closed:
+            await self.start()
+
+        attempts = 1 + (self.retries if method in self.IDEMPOTENT_METHODS else 0)
+        url = f"{self.base_url}{endpoint}"
+        for attempt in range(attempts):
+            try:
+                async with self.session.request(
+                    method, url, json=payload, params=params, timeout=timeout or self.timeout
+                ) as resp:
+                    data = await resp.json(content_type=None) if resp.content_length != 0 else None
+                    if resp.status not in self.UNAVAILABLE_STATUSES:
+                        # Бэкенд ответил: даже 500 приложения не повод отключать его для всех
+                        self.breaker.record_success()
+                        return data, resp.status
+                    result = data, resp.status
+                    self.breaker.record_failure()
+            except ValueError as e:
+                # Ответ пришёл, но не JSON — повтор и разрыв цепи не помогут
+                logger.error(f"API Error: {method} {endpoint}: {e!r}")
+                return None, 500
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"API Error: {method} {endpoint}: {e!r}")
+                result = None, 500
+                self.breaker.record_failure()
+
+            if attempt + 1 < attempts and self.breaker.allow():
+                # Полный джиттер: повторы разных запросов не совпадают по времени
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            else:
+                break
+        return result
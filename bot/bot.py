@@ -1,7 +1,7 @@
 import os
+import asyncio
 import logging
-import aiohttp
-import json
+import html
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -17,10 +17,16 @@ logger = logging.getLogger(__name__)
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 TOKEN = os.getenv("TOKEN")
-BASE_URL = "http://127.0.0.1:8000"
+BASE_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+BOT_TRANSPORT = os.getenv("BOT_TRANSPORT", "http")
+# polling — один процесс; webhook — апдейты по HTTP, реплик может быть несколько
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Вызовы Telegram API только логируются — для проверки webhook без Telegram
+BOT_FAKE_API = os.getenv("BOT_FAKE_API", "0") == "1"
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.filters import Command, StateFilter
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state, State, StatesGroup
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
@@ -29,13 +35,29 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
 import redis.asyncio as aioredis
 
+from bot.api_client import ApiClient
+from bot.pages import TaskPager
+from bot.transport import create_transport
+
 redis_conn = aioredis.from_url("redis://localhost:6379/0")
 storage = RedisStorage(redis=redis_conn, key_builder=DefaultKeyBuilder(with_destiny=True))
 
 # Инициализация бота
-bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode='HTML'))
+bot_session = None
+if BOT_FAKE_API:
+    from bot.testing import FakeSession
+
+    bot_session = FakeSession(log_calls=True)
+bot = Bot(token=TOKEN, session=bot_session, default=DefaultBotProperties(parse_mode='HTML'))
 dp = Dispatcher(storage=storage)
 
+# Одна сессия с пулом keep-alive соединений на всё время работы бота
+api_client = ApiClient(BASE_URL)
+# http — через FastAPI, local — прямые вызовы backend.services в этом процессе
+transport = create_transport(BOT_TRANSPORT, api_client)
+# Листание задач: курсоры и готовые страницы в том же Redis, что и FSM
+task_pager = TaskPager(transport, redis_conn)
+
 # Состояния FSM
 class FSMFillForm(StatesGroup):
     fill_username = State()
@@ -51,59 +73,105 @@ def get_main_keyboard():
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-# Вспомогательная функция для API запросов
-async def call_api(endpoint: str, method: str = 'GET', payload: dict = None):
-    async with aiohttp.ClientSession() as session:
-        url = f"{BASE_URL}{endpoint}"
-        try:
-            if method == 'GET':
-                async with session.get(url) as resp:
-                    return await resp.json(), resp.status
-            elif method == 'POST':
-                async with session.post(url, json=payload) as resp:
-                    return await resp.json(), resp.status
-        except Exception as e:
-            logger.error(f"API Error: {e}")
-            return None, 500
+# Кнопки листания над главным меню
+def get_tasks_keyboard(status: str, page: int, has_next: bool):
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton(text='◀️ Назад', callback_data=f'tasks:{status}:{page - 1}'))
+    if has_next:
+        nav.append(InlineKeyboardButton(text='Вперёд ▶️', callback_data=f'tasks:{status}:{page + 1}'))
+    buttons = get_main_keyboard().inline_keyboard
+    return InlineKeyboardMarkup(inline_keyboard=[nav, *buttons] if nav else buttons)
+
+def format_tasks(header: str, tasks: list) -> str:
+    lines = [header, ""]
+    for i, task in enumerate(tasks, 1):
+        icon = "✅" if task.get('is_completed') else "⏳"
+        lines.append(f"{i}. {icon} <b>{html.escape(task['title'])}</b>")
+        if task.get('description'):
+            lines.append(f"   └ <i>{html.escape(task['description'])}</i>")
+        if task.get('deadline'):
+            lines.append(f"   └ <i>{task['deadline']}</i>")
+        lines.append("")
+    return "\n".join(lines)
+
+@dp.startup()
+async def on_startup():
+    await transport.start()
+
+@dp.shutdown()
+async def on_shutdown():
+    await transport.close()
 
 # --- ХЕНДЛЕРЫ ---
 
 @dp.message(Command(commands=["start"]))
 async def process_start_command(message: Message):
-    await message.answer(
-        text=f'Привет, {message.from_user.first_name}! Состояния теперь хранятся в Redis.',
-        reply_markup=get_main_keyboard()
-    )
+    text = f'Привет, {message.from_user.first_name}! Состояния теперь хранятся в Redis.'
+    # Счётчики — одна строка в базе, без загрузки списков задач
+    stats, status = await transport.task_stats(message.from_user.id)
+    if status == 200:
+        text += (
+            f"\n\n⏳ Активных: {stats['active']} · ✅ Завершённых: {stats['completed']}"
+            f" · ⚠️ Просрочено: {stats['overdue']}"
+        )
+    await message.answer(text=text, reply_markup=get_main_keyboard())
 
 @dp.callback_query(F.data.startswith('button_show_'))
 async def process_show_tasks(callback: CallbackQuery):
-    user_tid = callback.from_user.id
     action = callback.data.replace('button_show_', '')
-    
-    endpoints = {
-        "all": f"/task/show/{user_tid}",
-        "active": f"/task/showactive/{user_tid}",
-        "closed": f"/task/showclosed/{user_tid}"
-    }
-    
-    data, status = await call_api(endpoints.get(action))
-    
-    if status == 200 and data:
-        msg = f"<b>📋 Ваши задачи ({action}):</b>\n\n"
-        for i, task in enumerate(data, 1):
-            icon = "✅" if task.get('is_completed') else "⏳"
-            msg += f"{i}. {icon} <b>{task['title']}</b>\n"
-            if task.get('description'):
-                msg += f"   └ <i>{task['description']}</i>\n"
-            if task.get('deadline'):
-                msg += f"   └ <i>{task['deadline']}</i>\n"
-            msg += "\n"
-    else:
+
+    # Только первая страница; остальные — по кнопкам, редактированием этого же сообщения
+    task_page, _ = await task_pager.fetch(callback.from_user.id, action, 0)
+    if task_page is None:
         msg = "📭 Задач не найдено. Зарегистрируйтесь, если еще не сделали этого."
-    
-    await callback.message.answer(msg, reply_markup=get_main_keyboard())
+        await callback.message.answer(msg, reply_markup=get_main_keyboard())
+    else:
+        sent = await callback.message.answer(
+            task_page.text, reply_markup=get_tasks_keyboard(action, 0, task_page.has_next)
+        )
+        await task_pager.remember(sent.chat.id, sent.message_id, action, 0, None, task_page)
     await callback.answer()
 
+@dp.callback_query(F.data.startswith('tasks:'))
+async def process_tasks_page(callback: CallbackQuery):
+    _, action, page = callback.data.split(':')
+    if not isinstance(callback.message, Message):
+        await callback.answer("Сообщение устарело, откройте список заново.")
+        return
+
+    task_page, page, _ = await task_pager.open(
+        callback.message.chat.id, callback.message.message_id, callback.from_user.id, action, int(page)
+    )
+    if task_page is None:
+        await callback.answer("📭 Задач не найдено.")
+        return
+    try:
+        await callback.message.edit_text(
+            task_page.text, reply_markup=get_tasks_keyboard(action, page, task_page.has_next)
+        )
+    except TelegramBadRequest:
+        # Страница не изменилась — Telegram отвечает ошибкой «message is not modified»
+        pass
+    await callback.answer()
+
+@dp.message(Command(commands=["search"]))
+async def process_search(message: Message, command: CommandObject):
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Использование: <code>/search текст</code>")
+        return
+
+    data, status = await transport.search_tasks(message.from_user.id, query)
+
+    if status == 200 and data:
+        msg = format_tasks(f"<b>🔎 Найдено по запросу «{html.escape(query)}»:</b>", data)
+    elif status == 404:
+        msg = "📭 Вы ещё не зарегистрированы."
+    else:
+        msg = "📭 Ничего не найдено."
+    await message.answer(msg, reply_markup=get_main_keyboard())
+
 # --- РЕГИСТРАЦИЯ ЧЕРЕЗ REDIS ---
 
 @dp.callback_query(F.data == 'button_reg_pressed')
@@ -128,8 +196,7 @@ async def process_password(message: Message, state: FSMContext):
     telegram_id = message.from_user.id
     
     # Отправляем на бэкенд
-    payload = {"username": username, "password": password, "telegram_id": telegram_id}
-    res, status_code = await call_api("/user/add_tlg/", method='POST', payload=payload)
+    res, status_code = await transport.register_user(username, password, telegram_id)
     
     if status_code == 200:
         await message.answer(f"✅ Успех! Логин: <code>{username}</code>", reply_markup=get_main_keyboard())
@@ -143,5 +210,14 @@ async def process_cancel(message: Message, state: FSMContext):
     await message.answer('Действие отменено.', reply_markup=get_main_keyboard())
 
 if __name__ == '__main__':
-    print("Бот (Redis) запущен...")
-    dp.run_polling(bot)
+    if BOT_MODE == "webhook":
+        from bot.webhook import run_webhook
+
+        print("Бот (webhook, Redis) запущен...")
+        run_webhook(dp, bot, redis_conn)
+    else:
+        from bot.dispatch import run_polling
+
+        print("Бот (Redis) запущен...")
+        # Чаты обрабатываются параллельно, апдейты одного чата — по порядку
+        asyncio.run(run_polling(dp, bot))
@@ -0,0 +1,233 @@
+"""Параллельная обработка апдейтов с сохранением порядка внутри чата.
+
+У каждого чата своя очередь, пул из BOT_WORKERS воркеров берёт чаты из
+общей очереди готовых по кругу: один чат в каждый момент обрабатывает не
+больше одного воркера (FSM регистрации видит сообщения по порядку), а
+медленный бэкенд у одного пользователя не задерживает остальных.
+
+Очереди ограничены: переполненная очередь чата отклоняет новые апдейты
+(ChatQueueFull), а общий лимит BOT_MAX_PENDING притормаживает приём —
+long polling перестаёт забирать апдейты, пока воркеры не разгрузятся.
+
+Очереди живут в процессе. Реплики webhook за балансировщиком получают
+апдейты одного чата вперемешку, поэтому там воркер дополнительно берёт
+блокировку чата в Redis (ChatLock): апдейты одного чата не обрабатываются
+одновременно на разных репликах и не гоняются за общее состояние FSM.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+from redis.exceptions import LockError
+
+from backend.services.metrics import (
+    bot_chat_queues, bot_update_duration_seconds, bot_update_queue_depth,
+    bot_submit_wait_seconds, bot_update_wait_seconds, bot_updates_rejected_total,
+)
+
+logger = logging.getLogger(__name__)
+
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", 16))
+BOT_CHAT_QUEUE_SIZE = int(os.getenv("BOT_CHAT_QUEUE_SIZE", 20))
+BOT_MAX_PENDING = int(os.getenv("BOT_MAX_PENDING", 1000))
+POLLING_TIMEOUT = int(os.getenv("BOT_POLLING_TIMEOUT", 30))
+POLLING_BACKOFF_MAX = 30.0
+# Блокировка чата между репликами: сколько держится без продления и сколько её ждать
+BOT_CHAT_LOCK_TTL = float(os.getenv("BOT_CHAT_LOCK_TTL", 60))
+BOT_CHAT_LOCK_WAIT = float(os.getenv("BOT_CHAT_LOCK_WAIT", 10))
+
+
+class ChatQueueFull(Exception):
+    pass
+
+
+class ChatLockTimeout(Exception):
+    pass
+
+
+class ChatLock:
+    """Блокировка чата в Redis на время обработки апдейта (SET NX PX + токен владельца)."""
+
+    def __init__(
+        self, redis, ttl: float = BOT_CHAT_LOCK_TTL, wait: float = BOT_CHAT_LOCK_WAIT, prefix: str = "bot:chat-lock:"
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.wait = wait
+        self.prefix = prefix
+
+    @asynccontextmanager
+    async def hold(self, key):
+        lock = self.redis.lock(f"{self.prefix}{key}", timeout=self.ttl, blocking_timeout=self.wait)
+        if not await lock.acquire():
+            raise ChatLockTimeout(key)
+        try:
+            yield
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                # Обработка шла дольше ttl — блокировка уже истекла или перешла другой реплике
+                logger.warning(f"Chat lock {key} expired before release")
+
+
+def chat_key(update: Update) -> Optional[int]:
+    """Чат апдейта (или пользователь, если чата нет); None — порядок не важен."""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat is not None:
+        return context.chat.id
+    if context.user is not None:
+        return context.user.id
+    return None
+
+
+class ChatOrderedDispatcher:
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int = BOT_WORKERS,
+        chat_queue_size: int = BOT_CHAT_QUEUE_SIZE,
+        max_pending: int = BOT_MAX_PENDING,
+        chat_lock: Optional[ChatLock] = None,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.chat_lock = chat_lock
+        self.workers = workers
+        self.chat_queue_size = chat_queue_size
+        # Очередь чата непуста ровно пока чат стоит в ready или его обрабатывает воркер
+        self.queues: Dict[object, Deque[Tuple[Update, asyncio.Future, float]]] = {}
+        self.ready: asyncio.Queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max_pending)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(), name=f"bot-worker-{n}") for n in range(self.workers)
+            ]
+
+    async def stop(self, timeout: float = 10.0):
+        # Даём доработать принятым апдейтам, затем гасим воркеры
+        pending = [item[1] for queue in self.queues.values() for item in queue]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, update: Update) -> asyncio.Future:
+        """Ставит апдейт в очередь чата; future завершится True/False по итогу обработки."""
+        key = chat_key(update)
+        if key is None:
+            key = ("update", update.update_id)
+        queue = self.queues.get(key)
+        if queue is not None and len(queue) >= self.chat_queue_size:
+            bot_updates_rejected_total.inc(reason="chat_queue_full")
+            raise ChatQueueFull(key)
+
+        start = time.perf_counter()
+        await self.slots.acquire()
+        bot_submit_wait_seconds.observe(time.perf_counter() - start)
+
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = deque()
+            bot_chat_queues.set(len(self.queues))
+            self.ready.put_nowait(key)
+        queue.append((update, future, time.perf_counter()))
+        bot_update_queue_depth.inc()
+        return future
+
+    async def _worker(self):
+        while True:
+            key = await self.ready.get()
+            queue = self.queues[key]
+            update, future, queued_at = queue[0]
+            bot_update_wait_seconds.observe(time.perf_counter() - queued_at)
+            ok = True
+            try:
+                async with self._locked(key):
+                    with bot_update_duration_seconds.time():
+                        await self.dispatcher.feed_update(self.bot, update)
+            except asyncio.CancelledError:
+                raise
+            except ChatLockTimeout:
+                # Чат долго занят на другой реплике: апдейт вернётся повтором Telegram
+                bot_updates_rejected_total.inc(reason="chat_lock_timeout")
+                logger.warning(f"Update {update.update_id}: chat {key} is locked by another replica")
+                ok = False
+            except Exception:
+                logger.exception(f"Update {update.update_id} failed")
+                ok = False
+            finally:
+                queue.popleft()
+                self.slots.release()
+                bot_update_queue_depth.dec()
+                if queue:
+                    # Чат встаёт в конец: остальные чаты не ждут, пока он разберёт свою очередь
+                    self.ready.put_nowait(key)
+                else:
+                    del self.queues[key]
+                    bot_chat_queues.set(len(self.queues))
+            if not future.done():
+                future.set_result(ok)
+
+    def _locked(self, key):
+        if self.chat_lock is None or isinstance(key, tuple):
+            # Один процесс (polling) или апдейт без чата — хватает локальной очереди
+            return _no_lock()
+        return self.chat_lock.hold(key)
+
+    async def poll(self, allowed_updates: Optional[list] = None, timeout: int = POLLING_TIMEOUT):
+        """Long polling: апдейты уходят в очереди, не дожидаясь обработки."""
+        offset = None
+        backoff = 1.0
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=offset, timeout=timeout, allowed_updates=allowed_updates,
+                    request_timeout=timeout + 10,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"getUpdates failed: {e}; retry in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(POLLING_BACKOFF_MAX, backoff * 2)
+                continue
+            backoff = 1.0
+            for update in updates:
+                offset = update.update_id + 1
+                try:
+                    await self.submit(update)
+                except ChatQueueFull:
+                    logger.warning(f"Chat queue full, update {update.update_id} dropped")
+
+
+@asynccontextmanager
+async def _no_lock():
+    yield
+
+
+async def run_polling(dispatcher: Dispatcher, bot: Bot, **kwargs):
+    ordered = ChatOrderedDispatcher(dispatcher, bot, **kwargs)
+    workflow_data = {"dispatcher": dispatcher, "bot": bot, **dispatcher.workflow_data}
+    await dispatcher.emit_startup(**workflow_data)
+    await ordered.start()
+    try:
+        await ordered.poll(dispatcher.resolve_used_update_types())
+    finally:
+        await ordered.stop()
+        await dispatcher.emit_shutdown(**workflow_data)
+        await bot.session.close()
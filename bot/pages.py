@@ -0,0 +1,131 @@
+"""Постраничный просмотр задач в Telegram.
+
+Страница — BOT_TASKS_PAGE_SIZE задач по курсору after_id; кнопки ◀️/▶️
+редактируют то же сообщение. Состояние листания хранится в Redis в хеше
+на сообщение (bot:tasks:{chat}:{message}) с коротким TTL: курсоры страниц
+(c:N) и уже отрисованные страницы (p:N). Повторное нажатие на известную
+страницу не ходит в бэкенд, новая страница — один запрос на page_size + 1
+задач. Если состояние истекло, листание начинается с первой страницы.
+"""
+import html
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import orjson
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+BOT_TASKS_PAGE_SIZE = int(os.getenv("BOT_TASKS_PAGE_SIZE", 10))
+BOT_PAGE_CACHE_TTL = int(os.getenv("BOT_PAGE_CACHE_TTL", 300))
+# 10 задач с обрезанным описанием гарантированно укладываются в 4096 символов
+MAX_DESCRIPTION = 150
+
+STATUS_TITLES = {"all": "все", "active": "активные", "closed": "завершённые"}
+
+
+@dataclass
+class TaskPage:
+    text: str
+    has_next: bool
+    next_cursor: Optional[int] = None
+
+
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def render_page(status: str, page: int, tasks: list, has_next: bool) -> str:
+    header = f"<b>📋 Ваши задачи ({STATUS_TITLES.get(status, status)}), стр. {page + 1}:</b>"
+    lines = [header, ""]
+    for i, task in enumerate(tasks, page * BOT_TASKS_PAGE_SIZE + 1):
+        icon = "✅" if task.get('is_completed') else "⏳"
+        lines.append(f"{i}. {icon} <b>{html.escape(task['title'])}</b>")
+        if task.get('description'):
+            lines.append(f"   └ <i>{html.escape(_shorten(task['description'], MAX_DESCRIPTION))}</i>")
+        if task.get('deadline'):
+            lines.append(f"   └ <i>{task['deadline']}</i>")
+        lines.append("")
+    if not tasks:
+        lines.append("📭 На этой странице задач нет.")
+    return "\n".join(lines)
+
+
+class TaskPager:
+    def __init__(self, transport, redis=None, page_size: int = BOT_TASKS_PAGE_SIZE, ttl: int = BOT_PAGE_CACHE_TTL):
+        self.transport = transport
+        self.redis = redis
+        self.page_size = page_size
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(chat_id: int, message_id: int) -> str:
+        return f"bot:tasks:{chat_id}:{message_id}"
+
+    async def fetch(self, telegram_id: int, status: str, page: int, after_id: Optional[int] = None):
+        """Одна страница из бэкенда: (TaskPage, None) или (None, HTTP-статус).
+
+        Пустой список на первой странице тоже None: показывать нечего.
+        """
+        # Лишняя задача только показывает, есть ли следующая страница
+        tasks, status_code = await self.transport.list_tasks(
+            telegram_id, status, limit=self.page_size + 1, after_id=after_id
+        )
+        if status_code != 200 or (page == 0 and not tasks):
+            return None, status_code
+        has_next = len(tasks) > self.page_size
+        tasks = tasks[:self.page_size]
+        next_cursor = tasks[-1]["id"] if has_next else None
+        return TaskPage(render_page(status, page, tasks, has_next), has_next, next_cursor), None
+
+    async def remember(self, chat_id: int, message_id: int, status: str, page: int, after_id: Optional[int], task_page: TaskPage):
+        if self.redis is None:
+            return
+        fields = {
+            "status": status,
+            f"c:{page}": "" if after_id is None else after_id,
+            f"p:{page}": orjson.dumps({"text": task_page.text, "has_next": task_page.has_next}),
+        }
+        if task_page.next_cursor is not None:
+            fields[f"c:{page + 1}"] = task_page.next_cursor
+        key = self._key(chat_id, message_id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping=fields)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Task page cache unavailable: {e}")
+
+    async def _cached(self, chat_id: int, message_id: int, status: str, page: int):
+        """(страница, курсор) из Redis; курсор False — состояния нет."""
+        if self.redis is None:
+            return None, False
+        try:
+            stored_status, cursor, rendered = await self.redis.hmget(
+                self._key(chat_id, message_id), ["status", f"c:{page}", f"p:{page}"]
+            )
+        except RedisError as e:
+            logger.warning(f"Task page cache unavailable: {e}")
+            return None, False
+        if stored_status is None or stored_status.decode() != status or cursor is None:
+            return None, False
+        if rendered is not None:
+            data = orjson.loads(rendered)
+            return TaskPage(data["text"], data["has_next"]), None
+        return None, int(cursor) if cursor else None
+
+    async def open(self, chat_id: int, message_id: int, telegram_id: int, status: str, page: int):
+        """Страница для нажатой кнопки: (TaskPage, номер страницы, HTTP-статус или None)."""
+        cached, after_id = await self._cached(chat_id, message_id, status, page)
+        if cached is not None:
+            return cached, page, None
+        if after_id is False:
+            # Состояние истекло или сообщение старое — начинаем сначала
+            page, after_id = 0, None
+        task_page, error = await self.fetch(telegram_id, status, page, after_id)
+        if task_page is not None:
+            await self.remember(chat_id, message_id, status, page, after_id, task_page)
+        return task_page, page, error
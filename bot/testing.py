@@ -0,0 +1,91 @@
+"""Бот без Telegram: фейковая сессия API и сборка апдейтов.
+
+FakeSession подменяет сеть у Bot — вызовы методов считаются и логируются,
+а ответ собирается правдоподобный. message_update и callback_update
+собирают апдейты так, как их прислал бы Telegram; ими пользуются
+инжектор webhook (python -m bot.webhook inject) и бенчмарки.
+"""
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import count
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, SendMessage
+from aiogram.types import Chat, Message, Update
+
+logger = logging.getLogger(__name__)
+
+_update_ids = count(int(time.time()))
+
+
+class FakeSession(BaseSession):
+    """Сессия Bot без сети: считает вызовы методов API."""
+
+    def __init__(self, log_calls: bool = False):
+        super().__init__()
+        self.calls = Counter()
+        self.log_calls = log_calls
+        self._message_id = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if self.log_calls:
+            logger.info(f"Fake API call {type(method).__name__}: {method.model_dump(exclude_none=True)}")
+        if isinstance(method, (SendMessage, EditMessageText)):
+            if isinstance(method, EditMessageText) and method.message_id:
+                message_id = method.message_id
+            else:
+                self._message_id += 1
+                message_id = self._message_id
+            return Message(
+                message_id=message_id,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def _user(chat_id: int) -> dict:
+    return {"id": chat_id, "is_bot": False, "first_name": "Test"}
+
+
+def message_update(chat_id: int, text: str, update_id: int = None) -> Update:
+    update_id = update_id or next(_update_ids)
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": _user(chat_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return Update.model_validate({"update_id": update_id, "message": message})
+
+
+def callback_update(chat_id: int, data: str, update_id: int = None, message_id: int = 1) -> Update:
+    update_id = update_id or next(_update_ids)
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(chat_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": "menu",
+            },
+        },
+    })
@@ -0,0 +1,112 @@
+"""Способы, которыми бот обращается к бэкенду.
+
+HttpTransport ходит в FastAPI по HTTP, LocalTransport вызывает сервисный
+слой backend.services напрямую в том же процессе (без сети и двойной
+сериализации). Выбор — переменная окружения BOT_TRANSPORT=http|local.
+"""
+from typing import Optional
+
+from bot.api_client import ApiClient
+
+STATUS_FILTERS = {"all": None, "active": False, "closed": True}
+
+
+class HttpTransport:
+    def __init__(self, client: ApiClient):
+        self.client = client
+
+    async def start(self):
+        await self.client.start()
+
+    async def close(self):
+        await self.client.close()
+
+    async def list_tasks(self, telegram_id: int, status: str = "all", **page):
+        params = {key: value for key, value in page.items() if value is not None}
+        is_completed = STATUS_FILTERS.get(status)
+        if is_completed is not None:
+            params["is_completed"] = str(is_completed).lower()
+        return await self.client.request("GET", f"/task/show/{telegram_id}", params=params or None)
+
+    async def task_stats(self, telegram_id: int):
+        return await self.client.request("GET", f"/task/stats/{telegram_id}")
+
+    async def search_tasks(self, telegram_id: int, query: str, limit: int = 10, offset: int = 0):
+        params = {"q": query, "limit": limit, "offset": offset}
+        return await self.client.request("GET", f"/task/search/{telegram_id}", params=params)
+
+    async def register_user(self, username: str, password: str, telegram_id: int):
+        payload = {"username": username, "password": password, "telegram_id": telegram_id}
+        return await self.client.request("POST", "/user/add_tlg/", payload=payload)
+
+
+class LocalTransport:
+    async def start(self):
+        pass
+
+    async def close(self):
+        from backend.database.database import dispose_engines
+
+        await dispose_engines()
+
+    async def list_tasks(self, telegram_id: int, status: str = "all", **page):
+        # Импорт здесь: backend сам импортирует модуль бота
+        from backend.database.database import ReadSessionLocal
+        from backend.schemas.schemas import TaskReadSchema
+        from backend.services import tasks as task_service
+
+        async with ReadSessionLocal() as db:
+            user_id = await task_service.get_user_id_by_telegram_id(db, telegram_id)
+            if user_id is None:
+                return None, 404
+            tasks = await task_service.list_tasks(
+                db, user_id, STATUS_FILTERS.get(status), **{k: v for k, v in page.items() if v is not None}
+            )
+            return [TaskReadSchema.model_validate(task).model_dump(mode="json") for task in tasks], 200
+
+    async def task_stats(self, telegram_id: int):
+        from backend.database.database import ReadSessionLocal
+        from backend.services.task_stats import get_task_stats_by_telegram_id
+
+        async with ReadSessionLocal() as db:
+            stats = await get_task_stats_by_telegram_id(db, telegram_id)
+            return (stats._asdict(), 200) if stats else (None, 404)
+
+    async def search_tasks(self, telegram_id: int, query: str, limit: int = 10, offset: int = 0):
+        from backend.database.database import ReadSessionLocal
+        from backend.schemas.schemas import TaskReadSchema
+        from backend.services import tasks as task_service
+
+        async with ReadSessionLocal() as db:
+            user_id = await task_service.get_user_id_by_telegram_id(db, telegram_id)
+            if user_id is None:
+                return None, 404
+            rows = await task_service.search_tasks(db, user_id, query, limit, offset)
+            return [TaskReadSchema.model_validate(row).model_dump(mode="json") for row in rows], 200
+
+    async def register_user(self, username: str, password: str, telegram_id: int):
+        from sqlalchemy.exc import IntegrityError
+
+        from backend.database.database import AsyncSessionLocal
+        from backend.schemas.schemas import UserReadSchema
+        from backend.services import users as user_service
+        from backend.services.hashing import HasherBusy, password_hasher
+
+        try:
+            hashed_password = await password_hasher.hash(password)
+        except HasherBusy:
+            return None, 503
+        async with AsyncSessionLocal() as db:
+            try:
+                user = await user_service.create_user(db, username, hashed_password, telegram_id)
+            except IntegrityError:
+                return None, 400
+            return UserReadSchema.model_validate(user).model_dump(mode="json"), 200
+
+
+def create_transport(kind: str, client: Optional[ApiClient] = None):
+    if kind == "local":
+        return LocalTransport()
+    if kind == "http":
+        return HttpTransport(client)
+    raise ValueError(f"Unknown BOT_TRANSPORT: {kind}")
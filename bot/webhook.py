@@ -0,0 +1,219 @@
+"""Приём апдейтов через webhook вместо long polling.
+
+Telegram присылает апдейт POST-запросом на WEBHOOK_PATH с заголовком
+X-Telegram-Bot-Api-Secret-Token; обработчик сверяет секрет и передаёт
+апдейт в тот же Dispatcher, что и polling. Реплик может быть несколько за
+балансировщиком: FSM общий в Redis, а повторную доставку одного апдейта
+(ретрай Telegram после таймаута) отсекает метка update_id в Redis.
+
+Апдейты обрабатываются через ChatOrderedDispatcher (bot/dispatch.py):
+параллельно для разных чатов и по порядку внутри одного. Ответ отдаётся
+после обработки: при ошибке хендлера Telegram получит 500 и повторит
+апдейт, при переполненной очереди чата — 503; метка дубля в обоих случаях
+снимается. Пока апдейт обрабатывается, метка живёт WEBHOOK_DEDUP_CLAIM_TTL
+секунд, и только после успеха — WEBHOOK_DEDUP_TTL: апдейт упавшей реплики
+не теряется на час. С Redis апдейты одного чата на разных репликах обрабатываются
+по очереди (ChatLock), без Redis запускайте одну реплику.
+
+Проверка без Telegram: реплика с BOT_FAKE_API=1 не вызывает API, а
+python -m bot.webhook inject "/start" --chat-id 1 шлёт ей фейковый апдейт.
+"""
+import argparse
+import asyncio
+import hmac
+import logging
+import os
+from typing import Optional
+
+import orjson
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import ClientSession, web
+from pydantic import ValidationError
+
+from backend.services.metrics import registry
+from bot.dispatch import ChatLock, ChatOrderedDispatcher, ChatQueueFull
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+# Публичный адрес балансировщика; пустой — webhook в Telegram не регистрируется
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+WEBHOOK_DEDUP_TTL = int(os.getenv("WEBHOOK_DEDUP_TTL", 3600))
+# Метка на время обработки: если реплика упала, повтор Telegram пройдёт через столько секунд
+WEBHOOK_DEDUP_CLAIM_TTL = int(os.getenv("WEBHOOK_DEDUP_CLAIM_TTL", 60))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdateDeduplicator:
+    """Метка update_id в Redis: апдейт обрабатывает только одна реплика.
+
+    claim ставит короткую метку на время обработки, done после успеха
+    продлевает её до ttl, release при ошибке снимает.
+    """
+
+    PROCESSING = "processing"
+    DONE = "done"
+
+    def __init__(
+        self,
+        redis,
+        ttl: int = WEBHOOK_DEDUP_TTL,
+        claim_ttl: int = WEBHOOK_DEDUP_CLAIM_TTL,
+        prefix: str = "bot:update:",
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+        self.prefix = prefix
+
+    async def claim(self, update_id: int) -> bool:
+        return bool(await self.redis.set(f"{self.prefix}{update_id}", self.PROCESSING, nx=True, ex=self.claim_ttl))
+
+    async def is_done(self, update_id: int) -> bool:
+        value = await self.redis.get(f"{self.prefix}{update_id}")
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value == self.DONE
+
+    async def done(self, update_id: int):
+        await self.redis.set(f"{self.prefix}{update_id}", self.DONE, ex=self.ttl)
+
+    async def release(self, update_id: int):
+        await self.redis.delete(f"{self.prefix}{update_id}")
+
+
+class WebhookHandler:
+    def __init__(
+        self, ordered: ChatOrderedDispatcher, secret: str, dedup: Optional[UpdateDeduplicator] = None
+    ):
+        self.ordered = ordered
+        self.bot = ordered.bot
+        self.secret = secret.encode()
+        self.dedup = dedup
+
+    def _authorized(self, request: web.Request) -> bool:
+        # Сравнение за постоянное время: секрет не подбирается по времени ответа
+        return hmac.compare_digest(request.headers.get(SECRET_HEADER, "").encode(), self.secret)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(orjson.loads(await request.read()), context={"bot": self.bot})
+        except (orjson.JSONDecodeError, ValidationError):
+            return web.Response(status=400)
+
+        if self.dedup is not None and not await self.dedup.claim(update.update_id):
+            if await self.dedup.is_done(update.update_id):
+                logger.info(f"Update {update.update_id} already handled, skipped")
+                return web.Response()
+            # Другая реплика ещё обрабатывает: пусть Telegram повторит позже
+            return web.Response(status=503)
+        status = 500
+        try:
+            handled = await self.ordered.submit(update)
+        except ChatQueueFull:
+            status = 503
+        else:
+            status = 200 if await handled else 500
+        finally:
+            if self.dedup is not None:
+                if status == 200:
+                    await self.dedup.done(update.update_id)
+                else:
+                    await self.dedup.release(update.update_id)
+        return web.Response(status=status)
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+def create_app(dispatcher: Dispatcher, bot: Bot, redis=None, secret: str = WEBHOOK_SECRET) -> web.Application:
+    if not secret:
+        raise RuntimeError("WEBHOOK_SECRET is required in webhook mode")
+    dedup = UpdateDeduplicator(redis) if redis is not None else None
+    if redis is None:
+        logger.warning("Webhook without Redis: run a single replica, chat order is per process")
+    ordered = ChatOrderedDispatcher(dispatcher, bot, chat_lock=ChatLock(redis) if redis is not None else None)
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, WebhookHandler(ordered, secret, dedup).handle)
+    app.router.add_get("/healthz", health)
+    app.router.add_get("/metrics", metrics)
+    # dp.startup/shutdown — те же хуки, что и при polling
+    setup_application(app, dispatcher, bot=bot)
+
+    async def register_webhook(app: web.Application):
+        if not WEBHOOK_BASE_URL:
+            return
+        # Идемпотентно: все реплики регистрируют один и тот же адрес
+        await bot.set_webhook(
+            WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=secret,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+        logger.info(f"Webhook registered at {WEBHOOK_BASE_URL}{WEBHOOK_PATH}")
+
+    async def start_workers(app: web.Application):
+        await ordered.start()
+
+    async def stop_workers(app: web.Application):
+        # Принятые апдейты дорабатываются до dp.shutdown
+        await ordered.stop()
+
+    async def close_bot_session(app: web.Application):
+        # Webhook не снимаем: остальные реплики продолжают принимать апдейты
+        await bot.session.close()
+
+    app.on_startup.append(start_workers)
+    app.on_startup.append(register_webhook)
+    app.on_shutdown.insert(0, stop_workers)
+    app.on_cleanup.append(close_bot_session)
+    return app
+
+
+def run_webhook(dispatcher: Dispatcher, bot: Bot, redis=None):
+    web.run_app(create_app(dispatcher, bot, redis), host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+
+
+async def inject(update: Update, url: str, secret: str = WEBHOOK_SECRET) -> int:
+    """Отправляет апдейт в webhook так же, как это делает Telegram."""
+    async with ClientSession() as session:
+        async with session.post(
+            url,
+            data=update.model_dump_json(exclude_none=True),
+            headers={SECRET_HEADER: secret, "Content-Type": "application/json"},
+        ) as response:
+            return response.status
+
+
+def main():
+    from bot.testing import callback_update, message_update
+
+    parser = argparse.ArgumentParser(description="Фейковые апдейты для webhook")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    injector = subparsers.add_parser("inject", help="отправить сообщение или нажатие кнопки")
+    injector.add_argument("text", help="текст сообщения или callback_data с --callback")
+    injector.add_argument("--chat-id", type=int, required=True)
+    injector.add_argument("--callback", action="store_true")
+    injector.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    args = parser.parse_args()
+
+    update = callback_update(args.chat_id, args.text) if args.callback else message_update(args.chat_id, args.text)
+    print(asyncio.run(inject(update, args.url)))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 BASE_DIR = Path(__file__).resolve().parent.parent # Если env.py в backend/migrations/
 sys.path.insert(0, str(BASE_DIR))
 from alembic import context
-from backend.database.database import Base
+from backend.database.database import Base, DATABASE_URL
 from backend.models.models import User, Task
 
 target_metadata = Base.metadata
@@ -19,11 +19,8 @@ target_metadata = Base.metadata
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-DB_PATH = BASE_DIR / "backend" / "tasks.db"
-db_url = f"sqlite+aiosqlite:///{DB_PATH}"
-
-# Перезаписываем URL из alembic.ini на наш правильный путь
-config.set_main_option("sqlalchemy.url", db_url)
+# Перезаписываем URL из alembic.ini на путь приложения (учитывает DATABASE_PATH)
+config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -44,6 +41,13 @@ if config.config_file_name is not None:
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # FTS5-таблица task_fts и её теневые таблицы создаются миграцией вручную
+    if type_ == "table" and name.startswith("task_fts"):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -60,6 +64,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -69,7 +74,9 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection, target_metadata=target_metadata, include_object=include_object
+    )
 
     with context.begin_transaction():
         context.run_migrations()
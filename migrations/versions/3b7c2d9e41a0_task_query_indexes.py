@@ -0,0 +1,35 @@
+"""Task query indexes
+
+Revision ID: 3b7c2d9e41a0
+Revises: ff9318824eac
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c2d9e41a0'
+down_revision: Union[str, Sequence[str], None] = 'ff9318824eac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_task_user_id_is_completed', 'task', ['user_id', 'is_completed'], unique=False)
+    op.create_index('ix_task_user_id_deadline', 'task', ['user_id', 'deadline'], unique=False)
+    op.create_index(
+        'ix_task_active_user_id_deadline', 'task', ['user_id', 'deadline'],
+        unique=False, sqlite_where=sa.text('is_completed = 0')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_active_user_id_deadline', table_name='task')
+    op.drop_index('ix_task_user_id_deadline', table_name='task')
+    op.drop_index('ix_task_user_id_is_completed', table_name='task')
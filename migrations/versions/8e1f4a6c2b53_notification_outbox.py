@@ -0,0 +1,49 @@
+"""Notification outbox
+
+Revision ID: 8e1f4a6c2b53
+Revises: 3b7c2d9e41a0
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e1f4a6c2b53'
+down_revision: Union[str, Sequence[str], None] = '3b7c2d9e41a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.Column('parse_mode', sa.String(length=16), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('failed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_outbox_message_pending', 'outbox_message', ['next_attempt_at'],
+        unique=False, sqlite_where=sa.text('failed_at IS NULL')
+    )
+    op.create_index(
+        'ix_outbox_message_chat_id', 'outbox_message', ['chat_id', 'id'],
+        unique=False, sqlite_where=sa.text('failed_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_message_chat_id', table_name='outbox_message')
+    op.drop_index('ix_outbox_message_pending', table_name='outbox_message')
+    op.drop_table('outbox_message')
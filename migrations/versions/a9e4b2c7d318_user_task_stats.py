@@ -0,0 +1,53 @@
+"""User task counters
+
+Revision ID: a9e4b2c7d318
+Revises: f5c1d8a4e263
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.database.stats_triggers import TASK_STATS_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4b2c7d318'
+down_revision: Union[str, Sequence[str], None] = 'f5c1d8a4e263'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_task_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('active', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('completed', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('overdue', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Те же определения, что и для create_all, чтобы две копии не разошлись
+    for statement in TASK_STATS_DDL:
+        op.execute(statement)
+    # Начальные значения по существующим задачам
+    op.execute("""
+        INSERT INTO user_task_stats(user_id, active, completed, overdue)
+        SELECT user_id,
+               SUM(is_completed = 0),
+               SUM(is_completed = 1),
+               SUM(is_completed = 0 AND overdue_notified_at IS NOT NULL)
+        FROM task
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS task_stats_au")
+    op.execute("DROP TRIGGER IF EXISTS task_stats_ad")
+    op.execute("DROP TRIGGER IF EXISTS task_stats_ai")
+    op.drop_table('user_task_stats')
@@ -0,0 +1,31 @@
+"""Task version and updated_at
+
+Revision ID: c4d9a7e2f815
+Revises: 8e1f4a6c2b53
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d9a7e2f815'
+down_revision: Union[str, Sequence[str], None] = '8e1f4a6c2b53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('task', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('task') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
@@ -0,0 +1,29 @@
+"""User tasks_version
+
+Revision ID: d7a3e9b1c624
+Revises: c4d9a7e2f815
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3e9b1c624'
+down_revision: Union[str, Sequence[str], None] = 'c4d9a7e2f815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('tasks_version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('tasks_version')
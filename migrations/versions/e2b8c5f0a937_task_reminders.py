@@ -0,0 +1,46 @@
+"""Task reminder markers
+
+Revision ID: e2b8c5f0a937
+Revises: d7a3e9b1c624
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8c5f0a937'
+down_revision: Union[str, Sequence[str], None] = 'd7a3e9b1c624'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task', sa.Column('reminded_at', sa.DateTime(), nullable=True))
+    op.add_column('task', sa.Column('overdue_notified_at', sa.DateTime(), nullable=True))
+    # Уже просроченные задачи считаем уведомлёнными, иначе первый запуск разошлёт их все
+    op.execute(
+        "UPDATE task SET reminded_at = CURRENT_TIMESTAMP, overdue_notified_at = CURRENT_TIMESTAMP "
+        "WHERE deadline < CURRENT_TIMESTAMP"
+    )
+    op.create_index(
+        'ix_task_reminder_pending', 'task', ['deadline'],
+        unique=False, sqlite_where=sa.text('is_completed = 0 AND reminded_at IS NULL')
+    )
+    op.create_index(
+        'ix_task_overdue_pending', 'task', ['deadline'],
+        unique=False, sqlite_where=sa.text('is_completed = 0 AND overdue_notified_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_overdue_pending', table_name='task')
+    op.drop_index('ix_task_reminder_pending', table_name='task')
+    with op.batch_alter_table('task') as batch_op:
+        batch_op.drop_column('overdue_notified_at')
+        batch_op.drop_column('reminded_at')
@@ -0,0 +1,36 @@
+"""Task full-text search (FTS5)
+
+Revision ID: f5c1d8a4e263
+Revises: e2b8c5f0a937
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from backend.database.fts import TASK_FTS_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1d8a4e263'
+down_revision: Union[str, Sequence[str], None] = 'e2b8c5f0a937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Те же определения, что и для create_all, чтобы две копии не разошлись
+    for statement in TASK_FTS_DDL:
+        op.execute(statement)
+    # Индексируем уже существующие задачи
+    op.execute("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS task_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS task_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS task_fts_ai")
+    op.execute("DROP TABLE IF EXISTS task_fts")
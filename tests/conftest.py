@@ -0,0 +1,56 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Настройки backend читаются при импорте: задаём их до первого импорта
+DB_PATH = Path(tempfile.mkdtemp(prefix="todo-tests-")) / "tasks.db"
+os.environ.update(
+    TOKEN="1:test",
+    DATABASE_PATH=str(DB_PATH),
+    DB_PROFILE="dev",
+    DB_ECHO="0",
+    SHARED_CACHE_BACKEND="memory",
+    # Фоновые задачи тесты запускают сами, когда нужно
+    APP_BACKGROUND_JOBS="0",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from backend.database.database import Base  # noqa: E402
+from backend.models import models  # noqa: E402, F401
+
+_sync_engine = create_engine(f"sqlite:///{DB_PATH}")
+Base.metadata.create_all(_sync_engine)
+_sync_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Один lifespan на сессию: после остановки пул bcrypt уже не поднять
+    from backend.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def run(client):
+    """Выполняет корутину в цикле приложения."""
+    return lambda coroutine_function, *args: client.portal.call(coroutine_function, *args)
+
+
+_telegram_ids = iter(range(10_000, 20_000))
+
+
+@pytest.fixture
+def tg_user(client):
+    """Новый пользователь с telegram_id: у каждого теста свои задачи и счётчики."""
+    telegram_id = next(_telegram_ids)
+    response = client.post(
+        "/user/add_tlg/",
+        json={"telegram_id": telegram_id, "username": f"user{telegram_id}", "password": "secret"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
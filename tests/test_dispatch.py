@@ -0,0 +1,59 @@
+import asyncio
+import random
+from collections import defaultdict
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from bot.dispatch import ChatOrderedDispatcher, ChatQueueFull
+from bot.testing import FakeSession, message_update
+
+
+def make_dispatcher(handled):
+    router = Router()
+
+    @router.message()
+    async def record(message: Message):
+        # Разная длительность обработки: без очереди чата порядок бы перемешался
+        await asyncio.sleep(random.uniform(0, 0.01))
+        handled[message.chat.id].append(message.text)
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+def test_updates_of_one_chat_are_handled_in_order():
+    handled = defaultdict(list)
+
+    async def scenario():
+        bot = Bot("1:test", session=FakeSession())
+        ordered = ChatOrderedDispatcher(make_dispatcher(handled), bot, workers=8)
+        await ordered.start()
+        futures = []
+        for n in range(20):
+            for chat_id in (1, 2, 3):
+                futures.append(await ordered.submit(message_update(chat_id, f"{n}")))
+        results = await asyncio.gather(*futures)
+        await ordered.stop()
+        return results
+
+    assert all(asyncio.run(scenario()))
+    for chat_id in (1, 2, 3):
+        assert handled[chat_id] == [str(n) for n in range(20)]
+
+
+def test_full_chat_queue_rejects_updates():
+    async def scenario():
+        bot = Bot("1:test", session=FakeSession())
+        # Воркеры не запущены: апдейты копятся в очереди чата
+        ordered = ChatOrderedDispatcher(make_dispatcher(defaultdict(list)), bot, chat_queue_size=2)
+        await ordered.submit(message_update(1, "a"))
+        await ordered.submit(message_update(1, "b"))
+        with pytest.raises(ChatQueueFull):
+            await ordered.submit(message_update(1, "c"))
+        # Другой чат не затронут
+        await ordered.submit(message_update(2, "a"))
+
+    asyncio.run(scenario())
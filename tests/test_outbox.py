@@ -0,0 +1,59 @@
+from sqlalchemy import select
+
+from backend.database.database import AsyncSessionLocal
+from backend.models.models import OutboxMessage
+from backend.services.outbox import OutboxDispatcher
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+async def outbox_rows(chat_id: int):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(OutboxMessage).where(OutboxMessage.chat_id == chat_id).order_by(OutboxMessage.id)
+        )
+        return result.scalars().all()
+
+
+def add_task(client, user, title):
+    response = client.post(
+        "/task/add/", json={"title": title, "username": user["username"]}, follow_redirects=False
+    )
+    assert response.status_code == 303
+
+
+def test_task_changes_are_written_to_outbox(client, run, tg_user):
+    add_task(client, tg_user, "buy milk")
+    rows = run(outbox_rows, tg_user["telegram_id"])
+    assert len(rows) == 1
+    assert "buy milk" in rows[0].text
+    assert rows[0].attempts == 0 and rows[0].failed_at is None
+
+
+def test_drain_respects_chat_token_bucket(client, run, tg_user):
+    chat = tg_user["telegram_id"]
+    for title in ("first", "second", "third"):
+        add_task(client, tg_user, title)
+
+    dispatcher = OutboxDispatcher()
+    dispatcher.bot = RecordingBot()
+    run(dispatcher.drain_once)
+
+    # Один токен на чат: ушло только первое сообщение, остальные ждут своей очереди
+    sent = [text for chat_id, text in dispatcher.bot.sent if chat_id == chat]
+    assert len(sent) == 1 and "first" in sent[0]
+    pending = run(outbox_rows, chat)
+    assert "second" in pending[0].text and "third" in pending[1].text
+    assert all(row.attempts == 0 for row in pending)
+    assert pending[0].next_attempt_at < pending[1].next_attempt_at
+
+    # До пополнения бакета отложенные строки не арендуются повторно
+    dispatcher.bot.sent.clear()
+    run(dispatcher.drain_once)
+    assert [text for chat_id, text in dispatcher.bot.sent if chat_id == chat] == []
@@ -0,0 +1,11 @@
+from backend.database.query_plan import check_query_plans, route_queries
+
+
+def test_hot_queries_use_indexes():
+    violations = check_query_plans()
+    assert not violations, "\n".join(f"{name}: {'; '.join(plan)}" for name, plan in violations)
+
+
+def test_query_names_are_unique():
+    names = [name for name, _ in route_queries()]
+    assert len(names) == len(set(names))
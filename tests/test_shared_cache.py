@@ -0,0 +1,48 @@
+import asyncio
+
+from backend.services.shared_cache import MemoryBackend, SharedCache
+
+
+async def make_cache(tombstone_ttl: float = 10) -> SharedCache:
+    cache = SharedCache(MemoryBackend(), tombstone_ttl=tombstone_ttl)
+    await cache.start()
+    return cache
+
+
+def test_tombstone_blocks_stale_refill():
+    async def scenario():
+        cache = await make_cache()
+        await cache.set("tasks_version:1", b"1")
+        # Запрос прочитал базу до commit, а записать в кеш успел уже после инвалидации
+        stale = b"1"
+        await cache.invalidate(["tasks_version:1"])
+        await cache.set("tasks_version:1", stale)
+        return await cache.get("tasks_version:1")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_key_accepts_writes_after_tombstone_expires():
+    async def scenario():
+        cache = await make_cache(tombstone_ttl=0.05)
+        await cache.invalidate(["tasks_version:1"])
+        await asyncio.sleep(0.1)
+        await cache.set("tasks_version:1", b"2")
+        return await cache.get("tasks_version:1")
+
+    assert asyncio.run(scenario()) == b"2"
+
+
+def test_invalidation_reaches_listeners():
+    seen = []
+
+    async def scenario():
+        cache = await make_cache()
+        cache.add_listener(seen.append)
+        await cache.set("user:tg:5", b"{}")
+        await cache.invalidate(["user:tg:5"])
+        return await cache.get("user:tg:5")
+
+    assert asyncio.run(scenario()) is None
+    # Свой процесс видит инвалидацию сразу и ещё раз из канала — слушатели идемпотентны
+    assert seen and all(keys == ["user:tg:5"] for keys in seen)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+
+def create_tasks(client, user, *titles, **fields):
+    response = client.post(
+        "/task/bulk",
+        json={"username": user["username"], "create": [{"title": title, **fields} for title in titles]},
+    )
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["results"]]
+
+
+def stats(client, user):
+    response = client.get(f"/task/stats/{user['telegram_id']}")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_patch_with_stale_if_match_returns_409(client, tg_user):
+    [task_id] = create_tasks(client, tg_user, "write report")
+
+    first = client.patch(f"/task/{task_id}", json={"title": "v2"}, headers={"If-Match": '"1"'})
+    assert first.status_code == 200
+    assert first.headers["ETag"] == '"2"'
+
+    stale = client.patch(f"/task/{task_id}", json={"title": "v3"}, headers={"If-Match": '"1"'})
+    assert stale.status_code == 409
+    assert stale.headers["ETag"] == '"2"'
+    assert client.get(f"/task/show/{tg_user['telegram_id']}").json()[0]["title"] == "v2"
+
+
+def test_show_returns_304_until_tasks_change(client, tg_user):
+    create_tasks(client, tg_user, "a", "b")
+    url = f"/task/show/{tg_user['telegram_id']}"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and len(first.json()) == 2
+
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+    create_tasks(client, tg_user, "c")
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == 3
+
+
+def test_bulk_results_and_stats_counters(client, tg_user):
+    first, second, third = create_tasks(client, tg_user, "one", "two", "three")
+    assert stats(client, tg_user) == {"active": 3, "completed": 0, "overdue": 0}
+
+    response = client.post(
+        "/task/bulk",
+        json={
+            "username": tg_user["username"],
+            "update": [{"id": first, "title": "one!"}, {"id": 999_999, "title": "missing"}],
+            "complete": [second],
+            "delete": [third],
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["updated"], body["completed"], body["deleted"], body["not_found"]) == (1, 1, 1, 1)
+    assert {(item["op"], item["id"], item["status"]) for item in body["results"]} == {
+        ("update", first, "updated"),
+        ("update", 999_999, "not_found"),
+        ("complete", second, "completed"),
+        ("delete", third, "deleted"),
+    }
+    assert stats(client, tg_user) == {"active": 1, "completed": 1, "overdue": 0}
+
+
+def test_bulk_rejects_update_without_fields(client, tg_user):
+    [task_id] = create_tasks(client, tg_user, "one")
+    response = client.post("/task/bulk", json={"username": tg_user["username"], "update": [{"id": task_id}]})
+    assert response.status_code == 422
+
+
+def test_stats_count_overdue_by_deadline(client, tg_user):
+    past = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    create_tasks(client, tg_user, "late", deadline=past)
+    create_tasks(client, tg_user, "on time", deadline=(datetime.utcnow() + timedelta(days=1)).isoformat())
+    # Отметку просрочки ставит планировщик, но /task/stats от неё не зависит
+    assert stats(client, tg_user) == {"active": 2, "completed": 0, "overdue": 1}
+
+
+def test_update_field_accepts_only_editable_fields(client, tg_user):
+    [task_id] = create_tasks(client, tg_user, "one")
+    for field in ("version", "user_id", "id"):
+        response = client.put(
+            "/task/update/", json={"id": task_id, "field": field, "new_value": "1", "username": tg_user["username"]}
+        )
+        assert response.status_code == 422, field
+
+    response = client.put(
+        "/task/update/", json={"id": task_id, "field": "title", "new_value": "two", "username": tg_user["username"]}
+    )
+    assert response.status_code == 200
+    assert client.get(f"/task/show/{tg_user['telegram_id']}").json()[0]["title"] == "two"
@@ -0,0 +1,70 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.dispatch import ChatOrderedDispatcher
+from bot.testing import FakeSession, message_update
+from bot.webhook import WEBHOOK_PATH, UpdateDeduplicator, WebhookHandler, inject
+
+
+class MemoryRedis:
+    """SET NX/EX, GET и DELETE — всё, что нужно UpdateDeduplicator."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = (value.encode(), ex)
+        return True
+
+    async def get(self, key):
+        return self.data.get(key, (None, None))[0]
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_failed_update_is_not_marked_as_handled():
+    redis = MemoryRedis()
+    handled = []
+    failing = [True]
+    router = Router()
+
+    @router.message()
+    async def record(message: Message):
+        if failing[0]:
+            raise RuntimeError("handler failed")
+        handled.append(message.text)
+
+    async def scenario():
+        dispatcher = Dispatcher()
+        dispatcher.include_router(router)
+        ordered = ChatOrderedDispatcher(dispatcher, Bot("1:test", session=FakeSession()))
+        dedup = UpdateDeduplicator(redis, ttl=3600, claim_ttl=60)
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, WebhookHandler(ordered, "secret", dedup).handle)
+        await ordered.start()
+        statuses = []
+        async with TestClient(TestServer(app)) as client:
+            url = str(client.make_url(WEBHOOK_PATH))
+            update = message_update(7, "hello", 1001)
+            statuses.append(await inject(update, url, "secret"))
+            assert redis.data == {}
+            failing[0] = False
+            # Повтор Telegram после ошибки обрабатывается, а не отбрасывается как дубль
+            statuses.append(await inject(update, url, "secret"))
+            assert redis.data["bot:update:1001"] == (b"done", 3600)
+            statuses.append(await inject(update, url, "secret"))
+            # Апдейт ещё обрабатывает другая реплика: Telegram повторит его позже
+            await redis.set("bot:update:1002", "processing", nx=True, ex=60)
+            statuses.append(await inject(message_update(7, "later", 1002), url, "secret"))
+        await ordered.stop()
+        return statuses
+
+    assert asyncio.run(scenario()) == [500, 200, 200, 503]
+    assert handled == ["hello"]